@@ -0,0 +1,626 @@
+"""
+OCR text extractors for the three session types
+Regex-based fallbacks that turn raw OCR text into flat session dicts.
+
+Plain Python with type annotations, so the module can optionally be compiled
+with mypyc (see setup.py); the pure-Python version is used otherwise.
+"""
+
+import copy
+import functools
+import hashlib
+import logging
+import re
+import threading
+from collections import OrderedDict
+from datetime import datetime
+from typing import Any, Callable, Dict, Optional, Set, Tuple, Union
+
+try:
+    import re2  # type: ignore  # Optional linear-time regex engine for the OCR extractors
+except ImportError:
+    re2 = None
+
+logger = logging.getLogger(__name__)
+
+# extract_number result; compiled patterns are re or re2 objects, so they're typed as Any
+Number = Optional[Union[int, float]]
+Extractor = Callable[[str], Dict[str, Any]]
+
+RESULT_CACHE_SIZE = 256  # Parsed results kept per extractor
+
+
+def _compile(pattern: str, flags: int = 0) -> Any:
+    """Compile an extraction pattern with RE2 when installed, otherwise with re.
+
+    RE2 matches in linear time, so noisy OCR text can't trigger backtracking
+    blowups. Patterns RE2 can't handle (e.g. lookaheads) fall back to re, made
+    ASCII-only so \\d, \\s and \\b behave like RE2's Perl classes.
+    """
+    if re2 is not None:
+        options = re2.Options()
+        options.case_sensitive = not flags & re.IGNORECASE
+        options.dot_nl = bool(flags & re.DOTALL)
+        options.log_errors = False
+        try:
+            return re2.compile(pattern, options)
+        except re2.error:
+            pass
+    return re.compile(pattern, flags | re.ASCII)
+
+
+# Pre-compiled extraction patterns (compiled once at import instead of on every call)
+_MONTHS = (
+    r"(?:january|february|march|april|may|june|july|august|september|october|november|december)"
+)
+# "<Month> <d>, <yyyy> [<time of day>[ - <team/detail>]]", searched once for both date and name
+_SESSION_DATE_RE = _compile(
+    rf"(?P<date>{_MONTHS}\s+\d{{1,2}},\s*\d{{4}})"
+    r"(?:(?P<time_of_day>\s+(?:morning|afternoon|evening))(?P<detail>[^,\n]*))?",
+    re.IGNORECASE,
+)
+_DURATION_RE = _compile(r"(\d+)\s*min", re.IGNORECASE)
+_TRAINING_TYPE_RE = _compile(r"(technical|physical|tactical)", re.IGNORECASE)
+_INTENSITY_RE = _compile(r"(low|moderate|high)", re.IGNORECASE)
+_KICKING_SECTION_RE = _compile(r".{0,100}kicking\s*power.{0,200}", re.IGNORECASE | re.DOTALL)
+
+# Two-footed percentage fallbacks (shared by Ball Work and Match)
+_LEFT_TOUCHES_PCT_FALLBACK_RE = _compile(r"(\d+)%.*?left.*?touch", re.IGNORECASE)
+_RIGHT_TOUCHES_PCT_FALLBACK_RE = _compile(r"(\d+)%.*?right.*?touch", re.IGNORECASE)
+_LEFT_RELEASES_PCT_FALLBACK_RE = _compile(r"(\d+)%.*?left.*?release", re.IGNORECASE)
+_RIGHT_RELEASES_PCT_FALLBACK_RE = _compile(r"(\d+)%.*?right.*?release", re.IGNORECASE)
+_LEFT_RECEIVES_PCT_FALLBACK_RE = _compile(r"(\d+)%.*?left.*?receive", re.IGNORECASE)
+_RIGHT_RECEIVES_PCT_FALLBACK_RE = _compile(r"(\d+)%.*?right.*?receive", re.IGNORECASE)
+
+# Ball Work / Speed & Agility patterns
+_BALL_TOUCHES_RE = _compile(r"ball\s*touches[:\s]*(\d+)", re.IGNORECASE)
+_TOTAL_DISTANCE_RE = _compile(r"total\s*distance[:\s]*([\d.]+)", re.IGNORECASE)
+_SPRINT_DISTANCE_RE = _compile(r"sprint\s*distance[:\s]*([\d.]+)", re.IGNORECASE)
+_ACCL_DECL_RE = _compile(r"accl\s*/\s*decl[:\s]*(\d+)", re.IGNORECASE)
+_KICKING_POWER_RE = _compile(r"kicking\s*power[:\s]*([\d.]+)", re.IGNORECASE)
+_LEFT_TOUCHES_RE = _compile(r"\bleft\s*foot[^:]{0,40}?touch[^:]{0,40}?[:\s]*(\d+)", re.IGNORECASE)
+_LEFT_TOUCHES_PCT_RE = _compile(
+    r"\bleft\s*foot[^:]{0,40}?touch[^:]{0,40}?\(?(\d+)%\)?", re.IGNORECASE
+)
+_RIGHT_TOUCHES_RE = _compile(r"\bright\s*foot[^:]{0,40}?touch[^:]{0,40}?[:\s]*(\d+)", re.IGNORECASE)
+_RIGHT_TOUCHES_PCT_RE = _compile(
+    r"\bright\s*foot[^:]{0,40}?touch[^:]{0,40}?\(?(\d+)%\)?", re.IGNORECASE
+)
+_LEFT_RELEASES_RE = _compile(
+    r"\bleft\s*foot[^:]{0,40}?release[^:]{0,40}?[:\s]*(\d+)", re.IGNORECASE
+)
+_LEFT_RELEASES_PCT_RE = _compile(
+    r"\bleft\s*foot[^:]{0,40}?release[^:]{0,40}?\(?(\d+)%\)?", re.IGNORECASE
+)
+_RIGHT_RELEASES_RE = _compile(
+    r"\bright\s*foot[^:]{0,40}?release[^:]{0,40}?[:\s]*(\d+)", re.IGNORECASE
+)
+_RIGHT_RELEASES_PCT_RE = _compile(
+    r"\bright\s*foot[^:]{0,40}?release[^:]{0,40}?\(?(\d+)%\)?", re.IGNORECASE
+)
+# Kicking power, tried in order until one matches
+_LEFT_KICKING_RES = (
+    _compile(r"\bleft\s*foot\s*kicking\s*power[:\s]*([\d.]+)", re.IGNORECASE),
+    _compile(r"\bleft\s*foot[^:]{0,40}?kicking[^:]{0,40}?power[:\s]*([\d.]+)", re.IGNORECASE),
+    _compile(r"kicking\s*power[^:]{0,40}?left[^:]{0,40}?[:\s]*([\d.]+)", re.IGNORECASE),
+)
+_RIGHT_KICKING_RES = (
+    _compile(r"\bright\s*foot\s*kicking\s*power[:\s]*([\d.]+)", re.IGNORECASE),
+    _compile(r"\bright\s*foot[^:]{0,40}?kicking[^:]{0,40}?power[:\s]*([\d.]+)", re.IGNORECASE),
+    _compile(r"kicking\s*power[^:]{0,40}?right[^:]{0,40}?[:\s]*([\d.]+)", re.IGNORECASE),
+    _compile(r"\bright\s*kicking\s*power[:\s]*([\d.]+)", re.IGNORECASE),
+)
+_RIGHT_KICKING_LOOSE_RE = _compile(
+    r"right.{0,20}?kicking.{0,20}?([\d.]+)", re.IGNORECASE | re.DOTALL
+)
+_TOP_SPEED_RE = _compile(r"top\s*speed[:\s]*([\d.]+)", re.IGNORECASE)
+_SPRINTS_RE = _compile(r"sprints[:\s]*(\d+)", re.IGNORECASE)
+_LEFT_TURNS_RE = _compile(r"\bleft\s*turns[:\s]*(\d+)", re.IGNORECASE)
+_BACK_TURNS_RE = _compile(r"back\s*turns[:\s]*(\d+)", re.IGNORECASE)
+_RIGHT_TURNS_RE = _compile(r"\bright\s*turns[:\s]*(\d+)", re.IGNORECASE)
+_INTENSE_TURNS_RE = _compile(r"intense\s*turns[:\s]*(\d+)", re.IGNORECASE)
+_TURN_ENTRY_SPEED_RE = _compile(r"(?:average\s*)?turn\s*entry\s*speed[:\s]*([\d.]+)", re.IGNORECASE)
+_TURN_EXIT_SPEED_RE = _compile(r"(?:average\s*)?turn\s*exit\s*speed[:\s]*([\d.]+)", re.IGNORECASE)
+
+# Match patterns
+_MATCH_POSITION_RE = _compile(r"([a-z]{1,3})\s+position", re.IGNORECASE)
+_MATCH_GOALS_RE = _compile(r"goals\s+(\d+)", re.IGNORECASE)
+_MATCH_ASSISTS_RE = _compile(r"assists\s+(\d+)", re.IGNORECASE)
+_MATCH_SCORE_RE = _compile(r"(\d+)\s*:\s*(\d+)")
+_MATCH_OPPONENT_RE = _compile(r"\d+\s*:\s*\d+\s+(.+?)(?:\n|$)")
+_MATCH_TWO_FOOTED_RE = _compile(r"two-?footed\s+(\d+)", re.IGNORECASE)
+_MATCH_DRIBBLING_RE = _compile(r"dribbling\s+(\d+)", re.IGNORECASE)
+_MATCH_FIRST_TOUCH_RE = _compile(r"first\s+touch\s+(\d+)", re.IGNORECASE)
+_MATCH_AGILITY_RE = _compile(r"agility\s+(\d+)", re.IGNORECASE)
+_MATCH_SPEED_RE = _compile(r"speed\s+(\d+)", re.IGNORECASE)
+_MATCH_POWER_RE = _compile(r"power\s+(\d+)", re.IGNORECASE)
+_MATCH_WORK_RATE_RE = _compile(r"work\s+rate\s+([\d.]+)", re.IGNORECASE)
+_MATCH_BALL_POSSESSIONS_RE = _compile(r"ball\s+possessions\s+(\d+)", re.IGNORECASE)
+_MATCH_TOTAL_DISTANCE_RE = _compile(r"total\s+distance\s+([\d.]+)", re.IGNORECASE)
+_MATCH_SPRINT_DISTANCE_RE = _compile(r"sprint\s+distance\s+([\d.]+)", re.IGNORECASE)
+_MATCH_TOP_SPEED_RE = _compile(r"top\s+speed\s+([\d.]+)", re.IGNORECASE)
+_MATCH_KICKING_POWER_RE = _compile(r"kicking\s+power\s+([\d.]+)", re.IGNORECASE)
+_MATCH_LEFT_TOUCHES_RE = _compile(
+    r"\bleft\s+foot[^:]{0,40}?touch[^:]{0,40}?[:\s]*(\d+)", re.IGNORECASE
+)
+_MATCH_LEFT_TOUCHES_PCT_RE = _compile(
+    r"\bleft\s+foot[^:]{0,40}?touch[^:]{0,40}?\(?(\d+)%\)?", re.IGNORECASE
+)
+_MATCH_RIGHT_TOUCHES_RE = _compile(
+    r"\bright\s+foot[^:]{0,40}?touch[^:]{0,40}?[:\s]*(\d+)", re.IGNORECASE
+)
+_MATCH_RIGHT_TOUCHES_PCT_RE = _compile(
+    r"\bright\s+foot[^:]{0,40}?touch[^:]{0,40}?\(?(\d+)%\)?", re.IGNORECASE
+)
+_MATCH_LEFT_RELEASES_RE = _compile(
+    r"\bleft\s+foot[^:]{0,40}?release[^:]{0,40}?[:\s]*(\d+)", re.IGNORECASE
+)
+_MATCH_LEFT_RELEASES_PCT_RE = _compile(
+    r"\bleft\s+foot[^:]{0,40}?release[^:]{0,40}?\(?(\d+)%\)?", re.IGNORECASE
+)
+_MATCH_RIGHT_RELEASES_RE = _compile(
+    r"\bright\s+foot[^:]{0,40}?release[^:]{0,40}?[:\s]*(\d+)", re.IGNORECASE
+)
+_MATCH_RIGHT_RELEASES_PCT_RE = _compile(
+    r"\bright\s+foot[^:]{0,40}?release[^:]{0,40}?\(?(\d+)%\)?", re.IGNORECASE
+)
+_MATCH_LEFT_RECEIVES_RE = _compile(
+    r"\bleft\s+foot[^:]{0,40}?receive[^:]{0,40}?[:\s]*(\d+)", re.IGNORECASE
+)
+_MATCH_LEFT_RECEIVES_PCT_RE = _compile(
+    r"\bleft\s+foot[^:]{0,40}?receive[^:]{0,40}?\(?(\d+)%\)?", re.IGNORECASE
+)
+_MATCH_RIGHT_RECEIVES_RE = _compile(
+    r"\bright\s+foot[^:]{0,40}?receive[^:]{0,40}?[:\s]*(\d+)", re.IGNORECASE
+)
+_MATCH_RIGHT_RECEIVES_PCT_RE = _compile(
+    r"\bright\s+foot[^:]{0,40}?receive[^:]{0,40}?\(?(\d+)%\)?", re.IGNORECASE
+)
+# Kicking power, tried in order until one matches
+_MATCH_LEFT_KICKING_RES = (
+    # Standard "left foot kicking power: 23.49 mph"
+    _compile(r"\bleft\s+foot\s*kicking\s*power[:\s]*(\d+\.?\d*)", re.IGNORECASE),
+    # Optional "mph" and more flexible spacing
+    _compile(r"\bleft\s*foot[^:]{0,40}?kicking[^:]{0,40}?power[:\s]*(\d+\.?\d*)", re.IGNORECASE),
+    # Reverse order "kicking power left foot"
+    _compile(r"kicking\s*power[^:]{0,40}?left[^:]{0,40}?[:\s]*(\d+\.?\d*)", re.IGNORECASE),
+)
+_MATCH_RIGHT_KICKING_RES = (
+    _compile(r"\bright\s+foot\s*kicking\s*power[:\s]*(\d+\.?\d*)", re.IGNORECASE),
+    _compile(r"\bright\s*foot[^:]{0,40}?kicking[^:]{0,40}?power[:\s]*(\d+\.?\d*)", re.IGNORECASE),
+    _compile(r"kicking\s*power[^:]{0,40}?right[^:]{0,40}?[:\s]*(\d+\.?\d*)", re.IGNORECASE),
+    # Without "foot" - just "right kicking power"
+    _compile(r"\bright\s*kicking\s*power[:\s]*(\d+\.?\d*)", re.IGNORECASE),
+)
+# Super loose - any decimal number after "right" within 20 chars of "kicking"
+_MATCH_RIGHT_KICKING_LOOSE_RE = _compile(
+    r"right.{0,20}?kicking.{0,20}?(\d+\.\d+)", re.IGNORECASE | re.DOTALL
+)
+_MATCH_DISTANCE_WITH_BALL_RE = _compile(
+    r"distance\s+with\s+ball[:\s]*(\d+\.?\d*)\s*yd", re.IGNORECASE
+)
+_MATCH_TOP_SPEED_WITH_BALL_RE = _compile(
+    r"top\s+speed\s+with\s+ball[:\s]*(\d+\.?\d*)\s*mph", re.IGNORECASE
+)
+_MATCH_INTENSE_TURNS_WITH_BALL_RE = _compile(
+    r"intense\s+turns\s+with\s+ball[:\s]*(\d+)", re.IGNORECASE
+)
+_MATCH_ONE_TOUCH_RE = _compile(r"one[- ]touch[:\s]*(\d+)", re.IGNORECASE)
+_MATCH_MULTIPLE_TOUCH_RE = _compile(r"multiple[- ]touch[:\s]*(\d+)", re.IGNORECASE)
+_MATCH_TOTAL_DURATION_RE = _compile(r"total\s+duration[:\s]*(\d+\.?\d*)\s*s", re.IGNORECASE)
+_MATCH_LACES_RE = _compile(r"laces[:\s]*(\d+)", re.IGNORECASE)
+_MATCH_INSIDE_RE = _compile(r"inside[:\s]*(\d+)", re.IGNORECASE)
+_MATCH_OTHER_RE = _compile(r"other[:\s]*(\d+)", re.IGNORECASE)
+# Left/back/right turn counts are read from one "12 8 10 left turns back turns right turns" span
+_MATCH_TURNS_RE = _compile(
+    r"(\d+)[^\d]+(\d+)[^\d]+(\d+)[^\d]+left\s+turns?[^\d]+back\s+turns?[^\d]+right\s+turns?",
+    re.IGNORECASE,
+)
+# Only [:\s#] may precede the count, so "intense turns with ball" never matches (no lookahead)
+_MATCH_INTENSE_TURNS_RE = _compile(r"intense\s+turns?[:\s#]*(\d+)", re.IGNORECASE)
+_MATCH_TURN_ENTRY_SPEED_RE = _compile(
+    r"(?:average\s*)?tu[rm]n?\s+entry\s+speed[:\s]*(\d+\.?\d*)", re.IGNORECASE
+)
+_MATCH_TURN_EXIT_SPEED_RE = _compile(
+    r"(?:average\s*)?tu[rm]n?\s+exit\s+speed[:\s]*(\d+\.?\d*)", re.IGNORECASE
+)
+_MATCH_SPRINTS_RE = _compile(r"sprints?\s*[:\s#]*(\d+)", re.IGNORECASE)
+_MATCH_FIRST_STEP_RE = _compile(r"first[- ]step[:\s]*(\d+)", re.IGNORECASE)
+_MATCH_INTENSE_ACCEL_RE = _compile(r"intense\s+(?:accel|acceleration)[:\s]*(\d+)", re.IGNORECASE)
+
+
+# Field tables: (section, field name, patterns). Patterns are tried in order until one
+# yields a non-zero number; dotted sections nest ("first_touch.ball_possessions")
+_BALL_WORK_FIELDS = (
+    ("session", "duration_minutes", (_DURATION_RE,)),
+    ("highlights", "ball_touches", (_BALL_TOUCHES_RE,)),
+    ("highlights", "total_distance_miles", (_TOTAL_DISTANCE_RE,)),
+    ("highlights", "sprint_distance_yards", (_SPRINT_DISTANCE_RE,)),
+    ("highlights", "accl_decl", (_ACCL_DECL_RE,)),
+    ("highlights", "kicking_power_mph", (_KICKING_POWER_RE,)),
+    ("two_footed", "left_foot_touches", (_LEFT_TOUCHES_RE,)),
+    (
+        "two_footed",
+        "left_foot_touches_percentage",
+        (_LEFT_TOUCHES_PCT_RE, _LEFT_TOUCHES_PCT_FALLBACK_RE),
+    ),
+    ("two_footed", "right_foot_touches", (_RIGHT_TOUCHES_RE,)),
+    (
+        "two_footed",
+        "right_foot_touches_percentage",
+        (_RIGHT_TOUCHES_PCT_RE, _RIGHT_TOUCHES_PCT_FALLBACK_RE),
+    ),
+    ("two_footed", "left_foot_releases", (_LEFT_RELEASES_RE,)),
+    (
+        "two_footed",
+        "left_foot_releases_percentage",
+        (_LEFT_RELEASES_PCT_RE, _LEFT_RELEASES_PCT_FALLBACK_RE),
+    ),
+    ("two_footed", "right_foot_releases", (_RIGHT_RELEASES_RE,)),
+    (
+        "two_footed",
+        "right_foot_releases_percentage",
+        (_RIGHT_RELEASES_PCT_RE, _RIGHT_RELEASES_PCT_FALLBACK_RE),
+    ),
+    ("two_footed", "left_foot_kicking_power_mph", _LEFT_KICKING_RES),
+    ("two_footed", "right_foot_kicking_power_mph", _RIGHT_KICKING_RES),
+    ("speed", "top_speed_mph", (_TOP_SPEED_RE,)),
+    ("speed", "sprints", (_SPRINTS_RE,)),
+    ("agility", "left_turns", (_LEFT_TURNS_RE,)),
+    ("agility", "back_turns", (_BACK_TURNS_RE,)),
+    ("agility", "right_turns", (_RIGHT_TURNS_RE,)),
+    ("agility", "intense_turns", (_INTENSE_TURNS_RE,)),
+    ("agility", "average_turn_entry_speed_mph", (_TURN_ENTRY_SPEED_RE,)),
+    ("agility", "average_turn_exit_speed_mph", (_TURN_EXIT_SPEED_RE,)),
+)
+
+_SPEED_AGILITY_FIELDS = (
+    ("session", "duration_minutes", (_DURATION_RE,)),
+    ("highlights", "total_distance_miles", (_TOTAL_DISTANCE_RE,)),
+    ("highlights", "sprint_distance_yards", (_SPRINT_DISTANCE_RE,)),
+    ("highlights", "accl_decl", (_ACCL_DECL_RE,)),
+    ("speed", "top_speed_mph", (_TOP_SPEED_RE,)),
+    ("speed", "sprints", (_SPRINTS_RE,)),
+    ("agility", "left_turns", (_LEFT_TURNS_RE,)),
+    ("agility", "back_turns", (_BACK_TURNS_RE,)),
+    ("agility", "right_turns", (_RIGHT_TURNS_RE,)),
+    ("agility", "intense_turns", (_INTENSE_TURNS_RE,)),
+    ("agility", "average_turn_entry_speed_mph", (_TURN_ENTRY_SPEED_RE,)),
+    ("agility", "average_turn_exit_speed_mph", (_TURN_EXIT_SPEED_RE,)),
+)
+
+_MATCH_FIELDS = (
+    ("session", "duration_minutes", (_DURATION_RE,)),
+    ("overview", "goals", (_MATCH_GOALS_RE,)),
+    ("overview", "assists", (_MATCH_ASSISTS_RE,)),
+    ("skills", "two_footed_score", (_MATCH_TWO_FOOTED_RE,)),
+    ("skills", "dribbling_score", (_MATCH_DRIBBLING_RE,)),
+    ("skills", "first_touch_score", (_MATCH_FIRST_TOUCH_RE,)),
+    ("skills", "agility_score", (_MATCH_AGILITY_RE,)),
+    ("skills", "speed_score", (_MATCH_SPEED_RE,)),
+    ("skills", "power_score", (_MATCH_POWER_RE,)),
+    ("highlights", "work_rate_yd_per_min", (_MATCH_WORK_RATE_RE,)),
+    ("highlights", "ball_possessions", (_MATCH_BALL_POSSESSIONS_RE,)),
+    ("highlights", "total_distance_mi", (_MATCH_TOTAL_DISTANCE_RE,)),
+    ("highlights", "sprint_distance_yd", (_MATCH_SPRINT_DISTANCE_RE,)),
+    ("highlights", "top_speed_mph", (_MATCH_TOP_SPEED_RE,)),
+    ("highlights", "kicking_power_mph", (_MATCH_KICKING_POWER_RE,)),
+    ("two_footed", "left_foot_touches", (_MATCH_LEFT_TOUCHES_RE,)),
+    (
+        "two_footed",
+        "left_foot_touches_pct",
+        (_MATCH_LEFT_TOUCHES_PCT_RE, _LEFT_TOUCHES_PCT_FALLBACK_RE),
+    ),
+    ("two_footed", "right_foot_touches", (_MATCH_RIGHT_TOUCHES_RE,)),
+    (
+        "two_footed",
+        "right_foot_touches_pct",
+        (_MATCH_RIGHT_TOUCHES_PCT_RE, _RIGHT_TOUCHES_PCT_FALLBACK_RE),
+    ),
+    ("two_footed", "left_foot_releases", (_MATCH_LEFT_RELEASES_RE,)),
+    (
+        "two_footed",
+        "left_foot_releases_pct",
+        (_MATCH_LEFT_RELEASES_PCT_RE, _LEFT_RELEASES_PCT_FALLBACK_RE),
+    ),
+    ("two_footed", "right_foot_releases", (_MATCH_RIGHT_RELEASES_RE,)),
+    (
+        "two_footed",
+        "right_foot_releases_pct",
+        (_MATCH_RIGHT_RELEASES_PCT_RE, _RIGHT_RELEASES_PCT_FALLBACK_RE),
+    ),
+    ("two_footed", "left_foot_receives", (_MATCH_LEFT_RECEIVES_RE,)),
+    (
+        "two_footed",
+        "left_foot_receives_pct",
+        (_MATCH_LEFT_RECEIVES_PCT_RE, _LEFT_RECEIVES_PCT_FALLBACK_RE),
+    ),
+    ("two_footed", "right_foot_receives", (_MATCH_RIGHT_RECEIVES_RE,)),
+    (
+        "two_footed",
+        "right_foot_receives_pct",
+        (_MATCH_RIGHT_RECEIVES_PCT_RE, _RIGHT_RECEIVES_PCT_FALLBACK_RE),
+    ),
+    ("two_footed", "left_foot_kicking_power_mph", _MATCH_LEFT_KICKING_RES),
+    ("two_footed", "right_foot_kicking_power_mph", _MATCH_RIGHT_KICKING_RES),
+    ("dribbling", "distance_with_ball_yd", (_MATCH_DISTANCE_WITH_BALL_RE,)),
+    ("dribbling", "top_speed_with_ball_mph", (_MATCH_TOP_SPEED_WITH_BALL_RE,)),
+    ("dribbling", "intense_turns_with_ball", (_MATCH_INTENSE_TURNS_WITH_BALL_RE,)),
+    ("first_touch.ball_possessions", "total", (_MATCH_BALL_POSSESSIONS_RE,)),
+    ("first_touch.ball_possessions", "one_touch", (_MATCH_ONE_TOUCH_RE,)),
+    ("first_touch.ball_possessions", "multiple_touch", (_MATCH_MULTIPLE_TOUCH_RE,)),
+    ("first_touch.ball_possessions", "total_duration_sec", (_MATCH_TOTAL_DURATION_RE,)),
+    ("first_touch.ball_release_footzone", "laces", (_MATCH_LACES_RE,)),
+    ("first_touch.ball_release_footzone", "inside", (_MATCH_INSIDE_RE,)),
+    ("first_touch.ball_release_footzone", "other", (_MATCH_OTHER_RE,)),
+    ("agility", "intense_turns", (_MATCH_INTENSE_TURNS_RE,)),
+    ("agility", "avg_turn_entry_speed_mph", (_MATCH_TURN_ENTRY_SPEED_RE,)),
+    ("agility", "avg_turn_exit_speed_mph", (_MATCH_TURN_EXIT_SPEED_RE,)),
+    ("speed", "top_speed_mph", (_MATCH_TOP_SPEED_RE,)),
+    ("speed", "sprints", (_MATCH_SPRINTS_RE,)),
+    ("power", "first_step_accelerations", (_MATCH_FIRST_STEP_RE,)),
+    ("power", "intense_accelerations", (_MATCH_INTENSE_ACCEL_RE,)),
+)
+
+
+def _build_prefilter(fields: Tuple[Any, ...]) -> Any:
+    """Fuse a field table's RE2 patterns into one RE2 set, or None without RE2.
+
+    A single pass of the set over the text reports which patterns match at all,
+    so the per-field searches that would scan the whole text and fail are skipped.
+    Returns (pattern set, {id(regex): set index}).
+    """
+    if re2 is None or not hasattr(re2, "Set"):
+        return None
+    options = re2.Options()
+    options.case_sensitive = False
+    options.log_errors = False
+    pattern_set = re2.Set.SearchSet(options)
+    indexes: Dict[int, int] = {}
+    for _, _, regexes in fields:
+        for regex in regexes:
+            # re fallbacks and patterns with other options are always searched directly
+            if isinstance(regex, re.Pattern) or id(regex) in indexes:
+                continue
+            if regex.options.case_sensitive or regex.options.dot_nl:
+                continue
+            indexes[id(regex)] = pattern_set.Add(regex.pattern)
+    pattern_set.Compile()
+    return pattern_set, indexes
+
+
+def _extract_fields(
+    text: str, fields: Tuple[Any, ...], prefilter: Any, result: Dict[str, Any]
+) -> Dict[str, Any]:
+    """Fill the nested `result` dict from a field table"""
+    indexes: Dict[int, int] = {}
+    matched: Set[int] = set()
+    if prefilter is not None:
+        pattern_set, indexes = prefilter
+        matched = set(pattern_set.Match(text) or ())
+
+    for section, name, regexes in fields:
+        target = result
+        for key in section.split("."):
+            target = target.setdefault(key, {})
+        value = None
+        for regex in regexes:
+            index = indexes.get(id(regex))
+            if index is not None and index not in matched:
+                value = None  # Can't match, so extract_number would return None
+                continue
+            value = extract_number(text, regex)
+            if value:
+                break
+        target[name] = value
+    return result
+
+
+_BALL_WORK_PREFILTER = _build_prefilter(_BALL_WORK_FIELDS)
+_SPEED_AGILITY_PREFILTER = _build_prefilter(_SPEED_AGILITY_FIELDS)
+_MATCH_PREFILTER = _build_prefilter(_MATCH_FIELDS)
+
+
+def _cache_by_text(extract: Extractor) -> Extractor:
+    """LRU-cache an extractor's results by a digest of the OCR text (so the text itself
+    isn't retained); callers get a deep copy they are free to modify"""
+    cache: "OrderedDict[bytes, Dict[str, Any]]" = OrderedDict()
+    stats = {"hits": 0, "misses": 0}
+    lock = threading.Lock()
+
+    @functools.wraps(extract)
+    def cached(text: str) -> Dict[str, Any]:
+        key = hashlib.blake2b(text.encode(), digest_size=16).digest()
+        with lock:
+            result = cache.get(key)
+            if result is not None:
+                cache.move_to_end(key)
+                stats["hits"] += 1
+                logger.debug("%s cache hit (%s hits, %s misses)", extract.__name__, *stats.values())
+        if result is None:
+            result = extract(text)
+            with lock:
+                stats["misses"] += 1
+                cache[key] = result
+                if len(cache) > RESULT_CACHE_SIZE:
+                    cache.popitem(last=False)
+        return copy.deepcopy(result)
+
+    return cached
+
+
+@_cache_by_text
+def extract_ball_work_data(text: str) -> Dict[str, Any]:
+    """Extract Ball Work session data from OCR text"""
+    session_name, date_str = extract_session_name_and_date(text)
+    result = _extract_fields(
+        text,
+        _BALL_WORK_FIELDS,
+        _BALL_WORK_PREFILTER,
+        {"session": {"session_name": session_name, "date": date_str}},
+    )
+    result["session"]["training_type"] = extract_value(text, _TRAINING_TYPE_RE, default="Technical")
+    result["session"]["intensity"] = extract_value(text, _INTENSITY_RE, default="Moderate")
+
+    # Kicking power - last-resort right-foot pattern
+    two_footed = result["two_footed"]
+    if not two_footed["right_foot_kicking_power_mph"]:
+        match = _RIGHT_KICKING_LOOSE_RE.search(text)
+        if match:
+            two_footed["right_foot_kicking_power_mph"] = float(match.group(1))
+
+    # DEBUG: Log kicking power section and extraction results
+    kicking_section_bw = _KICKING_SECTION_RE.search(text)
+    if kicking_section_bw:
+        logger.debug("[BALLWORK KICKING DEBUG] OCR text: %s", kicking_section_bw.group())
+    logger.debug(
+        "[BALLWORK KICKING DEBUG] Left kicking power extracted: %s",
+        two_footed["left_foot_kicking_power_mph"],
+    )
+    logger.debug(
+        "[BALLWORK KICKING DEBUG] Right kicking power extracted: %s",
+        two_footed["right_foot_kicking_power_mph"],
+    )
+    return result
+
+
+@_cache_by_text
+def extract_speed_agility_data(text: str) -> Dict[str, Any]:
+    """Extract Speed & Agility session data from OCR text"""
+    session_name, date_str = extract_session_name_and_date(text)
+    result = _extract_fields(
+        text,
+        _SPEED_AGILITY_FIELDS,
+        _SPEED_AGILITY_PREFILTER,
+        {"session": {"session_name": session_name, "date": date_str}},
+    )
+    result["session"]["training_type"] = extract_value(text, _TRAINING_TYPE_RE, default="Physical")
+    result["session"]["intensity"] = extract_value(text, _INTENSITY_RE, default="Moderate")
+    return result
+
+
+@_cache_by_text
+def extract_match_data(text: str) -> Dict[str, Any]:
+    """Extract Match session data from OCR text"""
+    # Session info (match names stop at the time of day)
+    session_name, date_str = extract_session_name_and_date(text, include_detail=False)
+    result = _extract_fields(
+        text,
+        _MATCH_FIELDS,
+        _MATCH_PREFILTER,
+        {
+            "session": {"session_name": session_name, "date": date_str},
+            "overview": {"position": extract_value(text, _MATCH_POSITION_RE, default=None)},
+        },
+    )
+    result["session"]["training_type"] = "Match"
+
+    # Team scores - looking for pattern like "cityplay fc 1 : 4 fc westlake"
+    overview = result["overview"]
+    score_match = _MATCH_SCORE_RE.search(text)
+    overview["athlete_team_score"] = int(score_match.group(1)) if score_match else None
+    overview["opposing_team_score"] = int(score_match.group(2)) if score_match else None
+
+    # Opponent name - text after the score pattern
+    opponent_match = _MATCH_OPPONENT_RE.search(text)
+    overview["opposing_team_name"] = (
+        opponent_match.group(1).strip().lower() if opponent_match else None
+    )
+
+    # Kicking power - last-resort right-foot pattern
+    two_footed = result["two_footed"]
+    if not two_footed["right_foot_kicking_power_mph"]:
+        match = _MATCH_RIGHT_KICKING_LOOSE_RE.search(text)
+        if match:
+            two_footed["right_foot_kicking_power_mph"] = float(match.group(1))
+
+    # DEBUG: Log kicking power section and extraction results
+    kicking_section = _KICKING_SECTION_RE.search(text)
+    if kicking_section:
+        logger.debug("[KICKING DEBUG] OCR text: %s", kicking_section.group())
+    logger.debug(
+        "[KICKING DEBUG] Left kicking power extracted: %s",
+        two_footed["left_foot_kicking_power_mph"],
+    )
+    logger.debug(
+        "[KICKING DEBUG] Right kicking power extracted: %s",
+        two_footed["right_foot_kicking_power_mph"],
+    )
+
+    # Left/back/right turn counts come from one span and lead the agility section
+    turns_match = _MATCH_TURNS_RE.search(text)
+    left_turns, back_turns, right_turns = (
+        (int(count) for count in turns_match.groups()) if turns_match else (None, None, None)
+    )
+    result["agility"] = {
+        "left_turns": left_turns,
+        "back_turns": back_turns,
+        "right_turns": right_turns,
+        **result["agility"],
+    }
+    return result
+
+
+def extract_session_name_and_date(
+    text: str, include_detail: bool = True
+) -> Tuple[Optional[str], Optional[str]]:
+    """Extract the session name and ISO date from the first "<Month> <d>, <yyyy>" in text.
+
+    Args:
+        text: OCR text
+        include_detail: Keep the text after the time of day (e.g. team name) in the name
+
+    Returns:
+        tuple: (session_name, date_str); session_name is None without a time of day
+    """
+    match = _SESSION_DATE_RE.search(text)
+    if not match:
+        return None, None
+
+    session_name = None
+    if match.group("time_of_day"):
+        session_name = match.group("date") + match.group("time_of_day")
+        if include_detail:
+            session_name += match.group("detail")
+        session_name = session_name.strip().lower()
+    return session_name, _parse_date(match.group("date"))
+
+
+@functools.lru_cache(maxsize=1024)
+def _parse_date(date_text: str) -> Optional[str]:
+    """Convert "February 4, 2026" to "2026-02-04" (None if it isn't a real date)"""
+    try:
+        return datetime.strptime(date_text, "%B %d, %Y").strftime("%Y-%m-%d")
+    except ValueError as e:
+        logger.warning("Date parsing failed for '%s': %s", date_text, e)
+        return None
+
+
+def extract_number(text: str, regex: Any) -> Number:
+    """Extract a number from text using a compiled regex"""
+    match = regex.search(text)
+    if match:
+        digits = match.group(1)
+        try:
+            return float(digits) if "." in digits else int(digits)
+        except ValueError:
+            return None
+    return None
+
+
+# Training type and intensity results, keyed by the usual captured casings so the lookup
+# needs no lowercasing; other casings (and positions) still go through capitalize()
+_CANONICAL_VALUES = {
+    form: value
+    for value in ("Technical", "Physical", "Tactical", "Low", "Moderate", "High")
+    for form in (value, value.upper(), value.lower())
+}
+
+
+def extract_value(text: str, regex: Any, default: Optional[str] = None) -> Optional[str]:
+    """Extract a text value from text using a compiled regex"""
+    match = regex.search(text)
+    if match:
+        value = match.group(1)
+        return _CANONICAL_VALUES.get(value) or value.capitalize()
+    return default
@@ -0,0 +1,27 @@
+"""
+Gunicorn configuration for the Soccer Session OCR server
+Usage: gunicorn -c gunicorn_conf.py server:app
+"""
+
+import multiprocessing
+import os
+
+bind = f"0.0.0.0:{os.environ.get('PORT', '5000')}"
+
+workers = int(os.environ.get("WEB_CONCURRENCY", multiprocessing.cpu_count() * 2 + 1))
+
+if os.environ.get("USE_GEVENT") == "1":
+    # Greenlet workers: each process holds many requests that are waiting on Claude
+    worker_class = "gevent"
+    worker_connections = int(os.environ.get("GUNICORN_WORKER_CONNECTIONS", 100))
+else:
+    # Threaded workers: a request waiting on Claude doesn't block the others in its process
+    worker_class = "gthread"
+    threads = int(os.environ.get("GUNICORN_THREADS", 8))
+    # Import the app once in the master so workers share its compiled regexes and prompt
+    # tables copy-on-write; per-process state (event loop, clients, log thread) restarts
+    # after fork. Not used with gevent, whose threads must be patched in each worker.
+    preload_app = True
+
+# Claude Vision calls on large match sessions can take longer than the 30s default
+timeout = 120
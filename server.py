@@ -4,19 +4,54 @@ Soccer Session OCR Web Server
 Simple Flask server for processing training session images with Claude Vision API
 """
 
-import base64
-import logging
 import os
-import re
-from datetime import datetime
+
+if os.environ.get("USE_GEVENT") == "1":
+    # Patch sockets/threads before anthropic (httpx) and flask are imported
+    from gevent import monkey
+
+    monkey.patch_all()
+
+import asyncio
+import atexit
+import collections
+import functools
+import hashlib
+import json
+import logging
+import logging.handlers
+import math
+import queue
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional
 
 import anthropic
+from anthropic import AsyncAnthropic
+from cachetools import TTLCache
 from flask import Flask, jsonify, request, send_from_directory
+from flask.json.provider import DefaultJSONProvider
+from flask_compress import Compress
 from flask_cors import CORS
+from werkzeug.exceptions import RequestEntityTooLarge
 
-# Configure logging
-logging.basicConfig(level=logging.INFO, format="%(asctime)s [%(levelname)s] %(message)s")
-logger = logging.getLogger(__name__)
+from extractors import (  # noqa: F401 (re-exported for callers that import them from server)
+    extract_ball_work_data,
+    extract_match_data,
+    extract_speed_agility_data,
+)
+
+try:
+    import orjson  # Faster JSON serialization for jsonify responses
+except ImportError:
+    orjson = None  # type: ignore[assignment]
+
+try:
+    import pybase64 as base64  # SIMD-accelerated drop-in for the stdlib encoder
+except ImportError:
+    import base64  # type: ignore[no-redef]
 
 # Configuration from environment
 API_KEY_MODE = os.environ.get("API_KEY_MODE", "user").lower()
@@ -24,13 +59,81 @@ SERVER_API_KEY = os.environ.get("ANTHROPIC_API_KEY", "")
 FLASK_ENV = os.environ.get("FLASK_ENV", "development")
 MAX_FILE_SIZE = 10 * 1024 * 1024  # 10MB per file
 MAX_FILES = 20
+# Per-type image limits (match sessions are only bounded by MAX_FILES)
+SESSION_TYPE_LIMITS = {"speed_agility": 2, "ball_work": 4}
+B64_CHUNK_SIZE = 57 * 1024  # Multiple of 3, so each chunk encodes without padding
+
+# Proactive Claude API throttling (defaults are ~80% of Anthropic Tier 1 limits). Each worker
+# process paces calls to the full budget; 429s from workers together overshooting it are retried.
+CLAUDE_RPM = int(os.environ.get("CLAUDE_RPM", 40))
+CLAUDE_TPM = int(os.environ.get("CLAUDE_TPM", 16000))
+CLAUDE_MAX_WAIT = float(os.environ.get("CLAUDE_MAX_WAIT", 20))  # seconds before answering 503
+RATE_LIMIT_RETRIES = 3
+IMAGE_TOKEN_ESTIMATE = 1600  # Claude downsizes images to ~1.15 megapixels (~1600 tokens)
+OUTPUT_TOKEN_ESTIMATE = 1024  # Typical reply; the charge is corrected from message.usage
+FILES_API_BETA = "files-api-2025-04-14"
+VALIDATION_CACHE_SIZE = 256
+VALIDATION_CACHE_TTL = 3600  # seconds
+CLIENT_CACHE_SIZE = 32  # Pooled clients per worker in user mode
+CLIENT_CLOSE_DELAY = 600  # seconds; the SDK's default request timeout
+
+# Configure logging: records are queued and written to stderr by a background thread,
+# so request handlers never block on log I/O
+_log_queue: "queue.SimpleQueue[logging.LogRecord]" = queue.SimpleQueue()
+_log_handler = logging.StreamHandler()
+_log_handler.setFormatter(logging.Formatter("%(asctime)s [%(levelname)s] %(message)s"))
+logging.getLogger().addHandler(logging.handlers.QueueHandler(_log_queue))
+logging.getLogger().setLevel(logging.INFO)
+
+_log_listener: Optional[logging.handlers.QueueListener] = None
+
+
+def _start_log_listener():
+    """Start this process's log writer thread (threads don't survive a fork, so a
+    preloaded app starts a fresh one in every gunicorn worker)"""
+    global _log_listener
+    _log_listener = logging.handlers.QueueListener(_log_queue, _log_handler)
+    _log_listener.start()
+
+
+def _stop_log_listener():
+    """Flush queued records on exit"""
+    if _log_listener is not None:
+        _log_listener.stop()
+
+
+_start_log_listener()
+os.register_at_fork(after_in_child=_start_log_listener)
+atexit.register(_stop_log_listener)
+
+LOG_LEVEL = logging.INFO if FLASK_ENV == "production" else logging.DEBUG
+logger = logging.getLogger(__name__)
+logger.setLevel(LOG_LEVEL)
+logging.getLogger("extractors").setLevel(LOG_LEVEL)
 
 # Validate server mode configuration
 if API_KEY_MODE == "server" and not SERVER_API_KEY:
-    print("[ERROR] API_KEY_MODE is 'server' but ANTHROPIC_API_KEY not set!")
-    print("[ERROR] Set ANTHROPIC_API_KEY or change API_KEY_MODE to 'user'")
+    logger.error("API_KEY_MODE is 'server' but ANTHROPIC_API_KEY not set!")
+    logger.error("Set ANTHROPIC_API_KEY or change API_KEY_MODE to 'user'")
+
+
+class OrjsonProvider(DefaultJSONProvider):
+    """Flask JSON provider backed by orjson (keys stay sorted, as with the default provider)"""
+
+    def dumps(self, obj, **kwargs):
+        return orjson.dumps(
+            obj, default=self.default, option=orjson.OPT_SORT_KEYS | orjson.OPT_NON_STR_KEYS
+        ).decode()
+
+    def loads(self, s, **kwargs):
+        return orjson.loads(s)
+
 
 app = Flask(__name__)
+if orjson is not None:
+    app.json = OrjsonProvider(app)
+# Werkzeug rejects oversized bodies while parsing (1MB headroom for multipart framing)
+app.config["MAX_CONTENT_LENGTH"] = MAX_FILES * MAX_FILE_SIZE + 1024 * 1024
 
 # Production: restrict origins, Development: allow all
 if FLASK_ENV == "production":
@@ -38,242 +141,458 @@ if FLASK_ENV == "production":
 else:
     CORS(app)
 
+# Compress JSON responses and index.html, preferring Brotli when the client accepts it
+app.config["COMPRESS_ALGORITHM"] = ["br", "gzip"]
+app.config["COMPRESS_MIN_SIZE"] = 512
+Compress(app)
 
-# Serve the frontend
-@app.route("/")
-def index():
-    return send_from_directory(".", "index.html")
 
+class ThrottleTimeout(Exception):
+    """A Claude call would have to wait longer than CLAUDE_MAX_WAIT for rate-limit budget"""
 
-@app.route("/config", methods=["GET"])
-def get_config():
-    """Return client configuration"""
-    return jsonify(
-        {
-            "api_key_mode": API_KEY_MODE,
-            "max_file_size": MAX_FILE_SIZE,
-            "max_files": MAX_FILES,
-            "session_type_limits": {
-                "speed_agility": {"max": 2, "description": "Speed & Agility: 1-2 images"},
-                "ball_work": {"max": 4, "description": "Ball Work: 1-4 images"},
-                "match": {"max": MAX_FILES, "description": "Match: Multiple images (typically 11)"},
-            },
-        }
+    def __init__(self, retry_after):
+        super().__init__(f"Claude rate-limit budget exhausted, retry in {retry_after:.0f}s")
+        self.retry_after = retry_after
+
+
+class RateLimiter:
+    """Sliding one-minute window over requests-per-minute and tokens-per-minute.
+
+    Shared by every request in the process that uses the same API key, so bursts
+    wait here instead of coming back from the API as 429s. Calls are charged an estimate up front
+    and corrected with reconcile() once the real usage is known.
+    """
+
+    def __init__(self, rpm, tpm, window=60.0):
+        self.rpm = rpm
+        self.tpm = tpm
+        self.window = window
+        self._calls = collections.deque()  # [timestamp, charged tokens]
+        self._tokens_in_window = 0
+        self._lock = threading.Lock()
+
+    def _reserve(self, tokens):
+        """Record a call if it fits in the window.
+
+        Returns:
+            tuple: (seconds to wait, or 0.0 once recorded; the recorded entry or None)
+        """
+        with self._lock:
+            now = time.monotonic()
+            cutoff = now - self.window
+            while self._calls and self._calls[0][0] <= cutoff:
+                self._tokens_in_window -= self._calls.popleft()[1]
+
+            wait = 0.0
+            if len(self._calls) >= self.rpm:
+                wait = self._calls[0][0] - cutoff
+            if tokens > self.tpm:
+                # Larger than the whole budget, so it can never fit: it goes as soon as the
+                # window isn't already spent, and later calls wait for it to age out
+                excess = self._tokens_in_window - self.tpm + 1
+            else:
+                excess = self._tokens_in_window + tokens - self.tpm
+            if excess > 0:
+                for timestamp, call_tokens in self._calls:
+                    excess -= call_tokens
+                    if excess <= 0:
+                        wait = max(wait, timestamp - cutoff)
+                        break
+
+            if wait > 0:
+                return wait, None
+            entry = [now, tokens]
+            self._calls.append(entry)
+            self._tokens_in_window += tokens
+            return 0.0, entry
+
+    async def acquire(self, tokens, max_wait=None):
+        """Wait until a call estimated at `tokens` fits under both limits.
+
+        Returns:
+            list: The window entry to pass to reconcile()
+
+        Raises:
+            ThrottleTimeout: If the call would have to wait more than `max_wait` seconds in all
+        """
+        deadline = None if max_wait is None else time.monotonic() + max_wait
+        while True:
+            wait, entry = self._reserve(tokens)
+            if entry is not None:
+                return entry
+            if deadline is not None and time.monotonic() + wait > deadline:
+                raise ThrottleTimeout(wait)
+            await asyncio.sleep(wait)
+
+    def reconcile(self, entry, tokens):
+        """Replace a call's estimated charge with the tokens it actually used"""
+        with self._lock:
+            # Entries that have aged out (or are about to) no longer count against the window
+            if entry[0] > time.monotonic() - self.window:
+                self._tokens_in_window += tokens - entry[1]
+                entry[1] = tokens
+
+
+# api_key -> RateLimiter; each key has its own Anthropic quota, so users don't queue behind
+# each other in user mode
+_rate_limiters: "collections.OrderedDict[str, RateLimiter]" = collections.OrderedDict()
+_rate_limiters_lock = threading.Lock()
+
+
+def rate_limiter_for(api_key):
+    """This process's rate limiter for one API key (the CLIENT_CACHE_SIZE most recent are kept)"""
+    with _rate_limiters_lock:
+        limiter = _rate_limiters.get(api_key)
+        if limiter is None:
+            limiter = _rate_limiters[api_key] = RateLimiter(CLAUDE_RPM, CLAUDE_TPM)
+            if len(_rate_limiters) > CLIENT_CACHE_SIZE:
+                _rate_limiters.popitem(last=False)
+        else:
+            _rate_limiters.move_to_end(api_key)
+        return limiter
+
+
+def estimate_tokens(messages, max_tokens):
+    """Rough input + output token estimate for a messages.create call"""
+    tokens = min(max_tokens, OUTPUT_TOKEN_ESTIMATE)
+    for message in messages:
+        for block in message["content"]:
+            if block["type"] == "image":
+                tokens += IMAGE_TOKEN_ESTIMATE
+            else:
+                tokens += len(block["text"]) // 4
+    return tokens
+
+
+def _should_retry(error):
+    """Whether a failed Claude call is worth another attempt, decided as the SDK's own retries do.
+
+    The clients are built with max_retries=0, so errors are only retried here, each attempt
+    paced through the rate limiter. 529 (overloaded) is covered by the >= 500 check.
+    """
+    if isinstance(error, anthropic.APIConnectionError):  # Includes timeouts
+        return True
+    if not isinstance(error, anthropic.APIStatusError):
+        return False
+    should_retry = error.response.headers.get("x-should-retry")
+    if should_retry in ("true", "false"):
+        return should_retry == "true"
+    return error.status_code in (408, 409, 429) or error.status_code >= 500
+
+
+def _retry_delay(error, attempt):
+    """Seconds to wait before a retry: the server's retry-after hint, else exponential backoff"""
+    headers = error.response.headers if isinstance(error, anthropic.APIStatusError) else {}
+    for header, per_second in (("retry-after-ms", 1000), ("retry-after", 1)):
+        try:
+            delay = float(headers.get(header)) / per_second
+        except (TypeError, ValueError):
+            continue
+        if 0 < delay <= 60:
+            return delay
+    return 2**attempt
+
+
+def throttled(create):
+    """Pace a Claude call through its API key's rate limiter and back off on retryable errors"""
+
+    @functools.wraps(create)
+    async def wrapper(client, **kwargs):
+        tokens = estimate_tokens(kwargs["messages"], kwargs["max_tokens"])
+        rate_limiter = rate_limiter_for(client.api_key)
+        for attempt in range(RATE_LIMIT_RETRIES + 1):
+            entry = await rate_limiter.acquire(tokens, max_wait=CLAUDE_MAX_WAIT)
+            try:
+                message = await create(client, **kwargs)
+            except anthropic.APIError as e:
+                if attempt == RATE_LIMIT_RETRIES or not _should_retry(e):
+                    raise
+                delay = _retry_delay(e, attempt)
+                logger.warning(
+                    "%s, retrying in %ss (%s/%s)",
+                    type(e).__name__,
+                    delay,
+                    attempt + 1,
+                    RATE_LIMIT_RETRIES,
+                )
+                await asyncio.sleep(delay)
+            else:
+                usage = message.usage
+                rate_limiter.reconcile(entry, usage.input_tokens + usage.output_tokens)
+                return message
+
+    return wrapper
+
+
+def _uses_files_api(messages):
+    """True if any content block references an image uploaded through the Files API"""
+    return any(
+        block.get("source", {}).get("type") == "file"
+        for message in messages
+        for block in message["content"]
     )
 
 
-def validate_session_type(client, files, claimed_type):
-    """Validate that uploaded images match the claimed session type.
+@throttled
+async def create_message(client, **kwargs):
+    """Call client.messages.create under the shared throttle"""
+    if _uses_files_api(kwargs["messages"]):
+        # file_id image sources are only accepted on the beta endpoint
+        return await client.beta.messages.create(betas=[FILES_API_BETA], **kwargs)
+    return await client.messages.create(**kwargs)
 
-    Args:
-        client: Anthropic client instance
-        files: List of uploaded file objects
-        claimed_type: Session type claimed by user ("match", "ball_work", "speed_agility")
 
-    Returns:
-        tuple: (is_valid: bool, detected_type: str, confidence: str)
+_loop = None
+_loop_pid = None
+_loop_lock = threading.Lock()
+
+
+def _event_loop():
+    """This process's background event loop, started on first use.
+
+    Async clients are bound to the loop they first run on, so every request
+    runs on this one loop (instead of a fresh asyncio.run loop each time)
+    to let connection pools outlive a single request. Restarted after a fork.
     """
-    print(f"[INFO] Validating session type - claimed: {claimed_type}")
+    global _loop, _loop_pid
+    with _loop_lock:
+        if _loop is None or _loop_pid != os.getpid():
+            _loop = asyncio.new_event_loop()
+            _loop_pid = os.getpid()
+            threading.Thread(target=_loop.run_forever, name="claude-loop", daemon=True).start()
+        return _loop
 
-    # Sample 1-2 images for validation (first and middle if more than 3 images)
-    sample_files = [files[0]]
-    if len(files) > 3:
-        sample_files.append(files[len(files) // 2])
-
-    # Prepare images for validation
-    validation_content = []
-    for file in sample_files:
-        file.seek(0)
-        image_data = base64.standard_b64encode(file.read()).decode("utf-8")
-        file.seek(0)  # Reset for later use
-
-        media_type = "image/jpeg"
-        if file.filename.lower().endswith(".png"):
-            media_type = "image/png"
-
-        validation_content.append(
-            {
-                "type": "image",
-                "source": {"type": "base64", "media_type": media_type, "data": image_data},
-            }
-        )
 
-    # Add validation prompt
-    validation_prompt = """Analyze these soccer training session screenshots and identify the session type.
+def run_async(coro):
+    """Run a coroutine on the background event loop and wait for its result"""
+    return asyncio.run_coroutine_threadsafe(coro, _event_loop()).result()
 
-CRITICAL: Match sessions include ALL the same metrics as Ball Work sessions PLUS game-specific information.
 
-**Match Session (GAME):**
-MUST HAVE at least ONE of these game-specific indicators:
-- Opposing team name
-- Goals and assists scored
-- Team scores (e.g., "2-1" or "Team Score: 3, Opponent: 1")
-- Position played (FWD, MID, DEF, GK)
-- Skill scores shown as circular percentages (Two-Footed, Dribbling, First Touch)
+# Strong references, so the loop doesn't lose tasks nobody awaits
+_background_tasks: "set[asyncio.Task]" = set()
 
-Match sessions will ALSO have ball work metrics like touches, kicking power, releases - don't let these fool you into thinking it's Ball Work!
 
-**Ball Work Session (TRAINING):**
-- Has ball touches, kicking power, left/right metrics
-- NO opposing team name
-- NO game scores or opponent
-- NO position played
-- NO skill score circles
+def run_in_background(coro):
+    """Start a coroutine on the running (background) loop without waiting for it"""
+    task = asyncio.ensure_future(coro)
+    _background_tasks.add(task)
+    task.add_done_callback(_background_tasks.discard)
+    return task
 
-**Speed and Agility Session:**
-- Focus on movement: distance, speed, sprints, turns
-- Minimal or no ball metrics
 
-Respond with ONLY one of these exact phrases:
-- "Match" (if you see ANY game/opponent info)
-- "Ball Work" (if ONLY training metrics, no game info)
-- "Speed and Agility" (if movement-focused)
+# api_key -> AsyncAnthropic, least recently used first
+_clients: "collections.OrderedDict[str, AsyncAnthropic]" = collections.OrderedDict()
+_clients_pid = None
+_clients_lock = threading.Lock()
 
-If uncertain, add "uncertain:" prefix (e.g., "uncertain: Match")"""
 
-    validation_content.append({"type": "text", "text": validation_prompt})
+async def _close_client(client):
+    """Close an evicted client once any request still holding it has finished"""
+    await asyncio.sleep(CLIENT_CLOSE_DELAY)
+    await client.close()
 
-    # Call Claude for validation (use Haiku for speed and cost)
-    try:
-        message = client.messages.create(
-            model="claude-3-haiku-20240307",
-            max_tokens=50,
-            messages=[{"role": "user", "content": validation_content}],
-        )
 
-        response = message.content[0].text.strip()
-        print(f"[INFO] Validation response: '{response}'")
+def get_client(api_key):
+    """Pooled AsyncAnthropic client for this process (one per key in user mode).
 
-        # Parse response
-        is_uncertain = response.lower().startswith("uncertain:")
-        detected_type = response.replace("uncertain:", "").strip().lower()
+    Up to CLIENT_CACHE_SIZE user keys are kept so a returning user skips the TLS
+    handshake; evicted clients have their connection pool closed on the event loop.
+    """
+    global _clients_pid
+    if API_KEY_MODE == "server":
+        api_key = SERVER_API_KEY
+    evicted = None
+    with _clients_lock:
+        if _clients_pid != os.getpid():
+            _clients.clear()  # Forked: the parent's sockets aren't ours to use or close
+            _clients_pid = os.getpid()
+        client = _clients.get(api_key)
+        if client is not None:
+            _clients.move_to_end(api_key)
+            return client
+        # max_retries=0: throttled() already retries
+        client = _clients[api_key] = AsyncAnthropic(api_key=api_key, max_retries=0)
+        if len(_clients) > CLIENT_CACHE_SIZE:
+            evicted = _clients.popitem(last=False)[1]
+    if evicted is not None:
+        asyncio.run_coroutine_threadsafe(_close_client(evicted), _event_loop())
+    return client
+
+
+def _read_chunks(file, chunk_size=B64_CHUNK_SIZE):
+    """Yield an uploaded file in chunks, enforcing MAX_FILE_SIZE as it goes.
+
+    Raises:
+        RequestEntityTooLarge: If the file is larger than MAX_FILE_SIZE
+    """
+    file.seek(0)
+    size = 0
+    while chunk := file.read(chunk_size):
+        size += len(chunk)
+        if size > MAX_FILE_SIZE:
+            raise RequestEntityTooLarge(
+                f"File {file.filename} exceeds {MAX_FILE_SIZE/1024/1024}MB limit"
+            )
+        yield chunk
 
-        # Normalize detected type
-        if "match" in detected_type:
-            detected_type = "match"
-        elif "ball work" in detected_type:
-            detected_type = "ball_work"
-        elif "speed" in detected_type and "agility" in detected_type:
-            detected_type = "speed_agility"
 
-        # Compare with claimed type
-        is_valid = detected_type == claimed_type.lower()
-        confidence = "uncertain" if is_uncertain else "confident"
+def read_image(file):
+    """Read an uploaded file's raw bytes, subject to MAX_FILE_SIZE"""
+    return b"".join(_read_chunks(file))
 
-        print(
-            f"[INFO] Validation result - detected: {detected_type}, valid: {is_valid}, confidence: {confidence}"
-        )
-        return is_valid, detected_type, confidence
 
-    except Exception as e:
-        print(f"[WARNING] Validation failed: {str(e)}")
-        # If validation fails, allow processing to continue (don't block on validation errors)
-        return True, claimed_type, "validation_error"
+# Image formats Claude accepts, by file extension (anything else is sent as JPEG)
+_MEDIA_TYPES = {
+    ".png": "image/png",
+    ".jpg": "image/jpeg",
+    ".jpeg": "image/jpeg",
+    ".webp": "image/webp",
+    ".gif": "image/gif",
+}
 
 
-@app.route("/process", methods=["POST"])
-def process_images():
-    """Process uploaded images and extract session data"""
-    try:
-        session_type = request.form.get("session_type")
-        files = request.files.getlist("images")
+def file_digest(file):
+    """BLAKE2b digest of an uploaded file's bytes, subject to MAX_FILE_SIZE"""
+    digest = hashlib.blake2b(digest_size=16)
+    for chunk in _read_chunks(file):
+        digest.update(chunk)
+    return digest.digest()
 
-        print(
-            f"[INFO] [{API_KEY_MODE.upper()} MODE] Processing request - Session: {session_type}, Files: {len(files)}"
-        )
 
-        if not files:
-            return jsonify({"error": "No images uploaded"}), 400
+def image_media_type(file):
+    """Media type Claude expects for an uploaded screenshot"""
+    return _MEDIA_TYPES.get(os.path.splitext(file.filename)[1].lower(), "image/jpeg")
 
-        # Validate file count
-        if len(files) > MAX_FILES:
-            return jsonify({"error": f"Too many files. Maximum {MAX_FILES} allowed"}), 400
 
-        # Validate session-type-specific image count (signature validation)
-        session_type_limits = {
-            "speed_agility": 2,
-            "ball_work": 4,
-            # Match sessions can have many images (no strict limit beyond MAX_FILES)
+def encode_image(file):
+    """Base64-encode an uploaded file chunk by chunk instead of reading it whole.
+
+    Raises:
+        RequestEntityTooLarge: If the file is larger than MAX_FILE_SIZE
+    """
+    encoded = bytearray()
+    pending = b""
+    for chunk in _read_chunks(file):
+        # Only encode whole 3-byte groups until the end so no padding lands mid-stream
+        chunk = pending + chunk if pending else chunk
+        cut = len(chunk) - len(chunk) % 3
+        encoded += base64.b64encode(chunk[:cut])
+        pending = chunk[cut:]
+    encoded += base64.b64encode(pending)
+    return encoded.decode("ascii")
+
+
+# pybase64 releases the GIL while encoding, so encodes overlap with each other and with Claude I/O
+encode_executor = ThreadPoolExecutor(max_workers=os.cpu_count(), thread_name_prefix="encode")
+
+
+async def encode_image_async(file):
+    """Run encode_image on the encode thread pool"""
+    return await asyncio.get_running_loop().run_in_executor(encode_executor, encode_image, file)
+
+
+async def dedupe_files(files):
+    """Drop repeat uploads of the same image, keeping the first of each in upload order.
+
+    Returns:
+        tuple: (unique files, their file_digest() values)
+    """
+    loop = asyncio.get_running_loop()
+    digests = await asyncio.gather(
+        *(loop.run_in_executor(encode_executor, file_digest, file) for file in files)
+    )
+    unique = {}
+    for digest, file in zip(digests, files):
+        unique.setdefault(digest, file)
+    if len(unique) < len(files):
+        logger.info("Dropped %s duplicate images", len(files) - len(unique))
+    return list(unique.values()), list(unique)
+
+
+async def build_image_blocks(files):
+    """Base64 image content blocks for every uploaded file, encoded in parallel"""
+    logger.info("Preparing %s images", len(files))
+    encoded = await asyncio.gather(*(encode_image_async(file) for file in files))
+    return [
+        {
+            "type": "image",
+            "source": {"type": "base64", "media_type": image_media_type(file), "data": data},
         }
+        for file, data in zip(files, encoded)
+    ]
 
-        if session_type in session_type_limits:
-            max_for_type = session_type_limits[session_type]
-            if len(files) > max_for_type:
-                type_display = session_type.replace("_", " ").title()
-                return (
-                    jsonify(
-                        {
-                            "error": f"{type_display} sessions should have at most {max_for_type} images. "
-                            f"You uploaded {len(files)}. Please check your session type selection."
-                        }
-                    ),
-                    400,
-                )
 
-        # Validate file sizes
-        for file in files:
-            file.seek(0, 2)
-            size = file.tell()
-            file.seek(0)
-            if size > MAX_FILE_SIZE:
-                return (
-                    jsonify(
-                        {"error": f"File {file.filename} exceeds {MAX_FILE_SIZE/1024/1024}MB limit"}
-                    ),
-                    400,
-                )
+async def upload_images(client, files):
+    """Upload raw image bytes through the Files API so they need no base64 round-trip.
 
-        # Get API key based on mode
-        if API_KEY_MODE == "server":
-            api_key = SERVER_API_KEY
-            if not api_key:
-                print("[ERROR] Server mode but no API key configured")
-                return jsonify({"error": "Server configuration error"}), 500
-        else:
-            # User mode - get from request
-            api_key = request.form.get("api_key")
-            if not api_key:
-                return jsonify({"error": "API key is required"}), 400
+    Returns:
+        list: Uploaded file ids in the order of `files`, or an empty list if the
+        SDK has no Files API or any upload failed (callers fall back to base64)
+    """
+    if not (hasattr(client, "beta") and hasattr(client.beta, "files")):
+        return []
 
-        # Initialize Anthropic client
-        client = anthropic.Anthropic(api_key=api_key)
+    loop = asyncio.get_running_loop()
 
-        # Validate that images match the claimed session type
-        is_valid, detected_type, confidence = validate_session_type(client, files, session_type)
+    async def upload(file):
+        # Read on the executor so a large upload doesn't stall the shared event loop
+        data = await loop.run_in_executor(encode_executor, read_image, file)
+        return await client.beta.files.upload(file=(file.filename, data, image_media_type(file)))
 
-        if not is_valid:
-            # Allow confusion between session types that share many visual metrics
-            confused_pairs = {
-                frozenset({"match", "ball_work"}),
-                frozenset({"speed_agility", "ball_work"}),
-            }
-            is_known_confusion = frozenset({session_type, detected_type}) in confused_pairs
+    logger.info("Uploading %s images via Files API...", len(files))
+    results = await asyncio.gather(*(upload(file) for file in files), return_exceptions=True)
 
-            if confidence == "uncertain" or is_known_confusion:
-                # Allow uncertain matches or known session type overlaps to proceed
-                print(
-                    f"[WARNING] Validation uncertain or known overlap - detected: {detected_type}, claimed: {session_type}, proceeding with user's selection"
-                )
-            else:
-                # Only block if we're confident and it's a clear mismatch (e.g., Speed & Agility vs Match)
-                display_detected = detected_type.replace("_", " ").title()
-                display_claimed = session_type.replace("_", " ").title()
+    file_ids = [result.id for result in results if not isinstance(result, BaseException)]
+    if len(file_ids) < len(results):
+        error = next(result for result in results if isinstance(result, BaseException))
+        logger.warning("Files API upload failed (%s), falling back to base64", error)
+        await delete_uploaded_files(client, file_ids)
+        return []
+    return file_ids
 
-                error_msg = (
-                    f"Session type mismatch: Images appear to be '{display_detected}' "
-                    f"but you selected '{display_claimed}'. Please verify your selection."
-                )
-                print(f"[ERROR] {error_msg}")
-                return jsonify({"error": error_msg}), 400
 
-        elif confidence == "uncertain":
-            print(
-                "[WARNING] Session type detection was uncertain, proceeding with user's selection"
-            )
+async def delete_uploaded_files(client, file_ids):
+    """Best-effort cleanup of images uploaded for a single request"""
+    results = await asyncio.gather(
+        *(client.beta.files.delete(file_id) for file_id in file_ids), return_exceptions=True
+    )
+    for file_id, result in zip(file_ids, results):
+        if isinstance(result, BaseException):
+            logger.warning("Could not delete uploaded file %s: %s", file_id, result)
+
+
+# Serve the frontend
+@app.route("/")
+def index():
+    return send_from_directory(".", "index.html")
+
+
+@app.route("/config", methods=["GET"])
+def get_config():
+    """Return client configuration"""
+    return jsonify(
+        {
+            "api_key_mode": API_KEY_MODE,
+            "max_file_size": MAX_FILE_SIZE,
+            "max_files": MAX_FILES,
+            "session_type_limits": {
+                "speed_agility": {
+                    "max": SESSION_TYPE_LIMITS["speed_agility"],
+                    "description": "Speed & Agility: 1-2 images",
+                },
+                "ball_work": {
+                    "max": SESSION_TYPE_LIMITS["ball_work"],
+                    "description": "Ball Work: 1-4 images",
+                },
+                "match": {"max": MAX_FILES, "description": "Match: Multiple images (typically 11)"},
+            },
+        }
+    )
 
-        # Create detailed prompt based on session type - ask for JSON directly
-        if session_type == "match":
-            extraction_prompt = """Extract all data from these soccer match session screenshots and return as a single JSON object. Look across ALL images to find these fields. Return ONLY valid JSON, no other text.
+
+# Extraction prompts per session type - ask Claude for flat JSON directly
+_PROMPTS = {
+    "match": """Extract all data from these soccer match session screenshots and return as a single JSON object. Look across ALL images to find these fields. Return ONLY valid JSON, no other text.
 
 IMPORTANT - TEAM AND SCORE EXTRACTION:
 On the match overview screen, two team names are shown with a score between them, like:
@@ -342,9 +661,8 @@ Required format:
   "intense_accel": number
 }
 
-Return only the JSON object with all available fields. Use null for missing values."""
-        elif session_type == "ball_work":
-            extraction_prompt = """Extract all data from these soccer ball work session screenshots and return as a single JSON object. Look across ALL images to find these fields. Return ONLY valid JSON, no other text.
+Return only the JSON object with all available fields. Use null for missing values.""",
+    "ball_work": """Extract all data from these soccer ball work session screenshots and return as a single JSON object. Look across ALL images to find these fields. Return ONLY valid JSON, no other text.
 
 Required format:
 {
@@ -378,9 +696,8 @@ Required format:
   "avg_turn_exit": number (mph)
 }
 
-Return only the JSON object with all available fields. Use null for missing values."""
-        else:  # speed_agility
-            extraction_prompt = """Extract all data from these speed & agility session screenshots and return as JSON. Return ONLY valid JSON.
+Return only the JSON object with all available fields. Use null for missing values.""",
+    "speed_agility": """Extract all data from these speed & agility session screenshots and return as JSON. Return ONLY valid JSON.
 
 Required format:
 {
@@ -400,760 +717,643 @@ Required format:
   "intense_turns": number,
   "avg_turn_entry": number (mph),
   "avg_turn_exit": number (mph)
-}"""
-
-        # Build content with all images + extraction prompt
-        content = []
-
-        # Add all images first
-        for i, file in enumerate(files):
-            print(f"[INFO] Preparing image {i+1}/{len(files)}: {file.filename}")
-            image_data = base64.standard_b64encode(file.read()).decode("utf-8")
-
-            # Determine media type
-            media_type = "image/jpeg"
-            if file.filename.lower().endswith(".png"):
-                media_type = "image/png"
-
-            content.append(
-                {
-                    "type": "image",
-                    "source": {"type": "base64", "media_type": media_type, "data": image_data},
-                }
-            )
+}""",
+}
+_VALID_SESSIONS = set(_PROMPTS)
 
-        # Add extraction prompt at the end
-        content.append({"type": "text", "text": extraction_prompt})
+_VALIDATION_PROMPT = """Analyze these soccer training session screenshots and identify the session type.
 
-        # Call Claude Vision API with ALL images at once
-        print(f"[INFO] Calling Claude API with {len(files)} images...")
-        try:
-            message = client.messages.create(
-                model="claude-3-5-sonnet-20241022",  # Try Sonnet first for better extraction
-                max_tokens=4096,
-                messages=[{"role": "user", "content": content}],
-            )
-            print("[INFO] Using Claude 3.5 Sonnet")
-        except Exception as e:
-            # Fallback to Haiku if Sonnet not available
-            print(f"[INFO] Sonnet not available ({str(e)}), falling back to Haiku")
-            message = client.messages.create(
-                model="claude-3-haiku-20240307",
-                max_tokens=4096,
-                messages=[{"role": "user", "content": content}],
-            )
-            print("[INFO] Using Claude 3 Haiku")
+CRITICAL: Match sessions include ALL the same metrics as Ball Work sessions PLUS game-specific information.
 
-        response_text = message.content[0].text
-        print(f"[INFO] Received response: {len(response_text)} characters")
+**Match Session (GAME):**
+MUST HAVE at least ONE of these game-specific indicators:
+- Opposing team name
+- Goals and assists scored
+- Team scores (e.g., "2-1" or "Team Score: 3, Opponent: 1")
+- Position played (FWD, MID, DEF, GK)
+- Skill scores shown as circular percentages (Two-Footed, Dribbling, First Touch)
 
-        # Parse JSON response directly
-        try:
-            # Extract JSON from response (handle if Claude adds any wrapper text)
-            import json
+Match sessions will ALSO have ball work metrics like touches, kicking power, releases - don't let these fool you into thinking it's Ball Work!
 
-            json_start = response_text.find("{")
-            json_end = response_text.rfind("}") + 1
-            if json_start >= 0 and json_end > json_start:
-                json_str = response_text[json_start:json_end]
-                extracted_json = json.loads(json_str)
-                logger.info(f"[SUCCESS] Extracted {len(extracted_json)} fields from JSON")
+**Ball Work Session (TRAINING):**
+- Has ball touches, kicking power, left/right metrics
+- NO opposing team name
+- NO game scores or opponent
+- NO position played
+- NO skill score circles
 
-                # DEBUG: Log kicking power fields from Claude's response
-                logger.info(
-                    f"[CLAUDE JSON] left_kicking_power: {extracted_json.get('left_kicking_power')}"
-                )
-                logger.info(
-                    f"[CLAUDE JSON] right_kicking_power: {extracted_json.get('right_kicking_power')}"
-                )
-                logger.info(
-                    f"[CLAUDE JSON] kicking_power (max): {extracted_json.get('kicking_power')}"
-                )
-            else:
-                print("[ERROR] No JSON found in response")
-                return jsonify({"error": "Failed to extract JSON from response"}), 500
-        except json.JSONDecodeError as e:
-            print(f"[ERROR] JSON parsing failed: {e}")
-            print(f"[ERROR] Response text: {response_text[:500]}")
-            return jsonify({"error": f"Invalid JSON response: {str(e)}"}), 500
+**Speed and Agility Session:**
+- Focus on movement: distance, speed, sprints, turns
+- Minimal or no ball metrics
 
-        # Format result based on session type (convert flat JSON to nested structure)
-        print(f"[INFO] Formatting result for {session_type}...")
-        if session_type == "ball_work":
-            result = format_ball_work_result(extracted_json)
-        elif session_type == "speed_agility":
-            result = format_speed_agility_result(extracted_json)
-        elif session_type == "match":
-            result = format_match_result(extracted_json)
-        else:
-            return jsonify({"error": "Invalid session type"}), 400
+Respond with ONLY one of these exact phrases:
+- "Match" (if you see ANY game/opponent info)
+- "Ball Work" (if ONLY training metrics, no game info)
+- "Speed and Agility" (if movement-focused)
 
-        print("[SUCCESS] Extraction complete!")
-        return jsonify({"success": True, "data": result, "ocr_text": response_text})
+If uncertain, add "uncertain:" prefix (e.g., "uncertain: Match")"""
 
-    except anthropic.AuthenticationError as e:
-        print(f"[ERROR] Authentication error: {str(e)}")
-        error_msg = "Invalid API key" if API_KEY_MODE == "user" else "Server API key invalid"
-        return jsonify({"error": error_msg}), 401
-    except anthropic.RateLimitError as e:
-        print(f"[ERROR] Rate limit: {str(e)}")
-        return jsonify({"error": "Rate limit exceeded. Try again later."}), 429
-    except Exception as e:
-        print(f"[ERROR] Unexpected: {type(e).__name__}: {str(e)}")
-        if FLASK_ENV == "development":
-            import traceback
+# (sample digest, claimed type) -> validation result, so retries of the same upload skip Haiku.
+# Only touched from the event loop thread, so it needs no lock.
+_validation_cache = TTLCache(maxsize=VALIDATION_CACHE_SIZE, ttl=VALIDATION_CACHE_TTL)
 
-            traceback.print_exc()
-            return jsonify({"error": f"{type(e).__name__}: {str(e)}"}), 500
-        else:
-            return jsonify({"error": "Processing error occurred"}), 500
 
+def validation_sample(items):
+    """The images validation looks at: the first, plus the middle one if there are more than 3"""
+    if len(items) > 3:
+        return [items[0], items[len(items) // 2]]
+    return items[:1]
 
-def extract_ball_work_data(text):
-    """Extract Ball Work session data from OCR text"""
-    text = text.lower()
 
-    # Session info
-    session_name_match = re.search(
-        r"((?:january|february|march|april|may|june|july|august|september|october|november|december)\s+\d{1,2},\s*\d{4}\s+(?:morning|afternoon|evening)[^,]*)",
-        text,
-        re.IGNORECASE,
-    )
-    session_name = session_name_match.group(1).strip() if session_name_match else None
+def sample_digest(digests):
+    """Cache key for the images validation samples, from every image's file_digest()"""
+    return hashlib.blake2b(b"".join(validation_sample(digests)), digest_size=16).hexdigest()
 
-    date_match = re.search(
-        r"((?:january|february|march|april|may|june|july|august|september|october|november|december)\s+\d{1,2},\s*\d{4})",
-        text,
-        re.IGNORECASE,
-    )
-    date_str = None
-    if date_match:
-        try:
-            date_obj = datetime.strptime(date_match.group(1), "%B %d, %Y")
-            date_str = date_obj.strftime("%Y-%m-%d")
-        except ValueError as e:
-            print(f"[WARNING] Date parsing failed for '{date_match.group(1)}': {e}")
-            date_str = None
-
-    duration = extract_number(text, r"(\d+)\s*min")
-    training_type = extract_value(text, r"(technical|physical|tactical)", default="Technical")
-    intensity = extract_value(text, r"(low|moderate|high)", default="Moderate")
-
-    # Highlights
-    ball_touches = extract_number(text, r"ball\s*touches[:\s]*(\d+)")
-    total_distance = extract_number(text, r"total\s*distance[:\s]*([\d.]+)")
-    sprint_distance = extract_number(text, r"sprint\s*distance[:\s]*([\d.]+)")
-    accl_decl = extract_number(text, r"accl\s*/\s*decl[:\s]*(\d+)")
-    kicking_power = extract_number(text, r"kicking\s*power[:\s]*([\d.]+)")
-
-    # Two-footed - More flexible patterns (with or without parentheses)
-    left_touches = extract_number(text, r"left\s*foot[^:]*touch[^:]*[:\s]*(\d+)")
-    left_touches_pct = extract_number(
-        text, r"left\s*foot[^:]*touch[^:]*\(?(\d+)%\)?"
-    ) or extract_number(text, r"(\d+)%.*?left.*?touch")
-    right_touches = extract_number(text, r"right\s*foot[^:]*touch[^:]*[:\s]*(\d+)")
-    right_touches_pct = extract_number(
-        text, r"right\s*foot[^:]*touch[^:]*\(?(\d+)%\)?"
-    ) or extract_number(text, r"(\d+)%.*?right.*?touch")
-
-    left_releases = extract_number(text, r"left\s*foot[^:]*release[^:]*[:\s]*(\d+)")
-    left_releases_pct = extract_number(
-        text, r"left\s*foot[^:]*release[^:]*\(?(\d+)%\)?"
-    ) or extract_number(text, r"(\d+)%.*?left.*?release")
-    right_releases = extract_number(text, r"right\s*foot[^:]*release[^:]*[:\s]*(\d+)")
-    right_releases_pct = extract_number(
-        text, r"right\s*foot[^:]*release[^:]*\(?(\d+)%\)?"
-    ) or extract_number(text, r"(\d+)%.*?right.*?release")
-
-    # Kicking power - Multiple pattern attempts for robustness
-    # DEBUG: Log kicking power section
-    kicking_section_bw = re.search(
-        r".{0,100}kicking\s*power.{0,200}", text, re.IGNORECASE | re.DOTALL
-    )
-    if kicking_section_bw:
-        logger.info(f"[BALLWORK KICKING DEBUG] OCR text: {kicking_section_bw.group()}")
-
-    left_kicking = extract_number(text, r"left\s*foot\s*kicking\s*power[:\s]*([\d.]+)")
-    if not left_kicking:
-        left_kicking = extract_number(text, r"left\s*foot[^:]*kicking[^:]*power[:\s]*([\d.]+)")
-    if not left_kicking:
-        left_kicking = extract_number(text, r"kicking\s*power[^:]*left[^:]*[:\s]*([\d.]+)")
-
-    right_kicking = extract_number(text, r"right\s*foot\s*kicking\s*power[:\s]*([\d.]+)")
-    if not right_kicking:
-        right_kicking = extract_number(text, r"right\s*foot[^:]*kicking[^:]*power[:\s]*([\d.]+)")
-    if not right_kicking:
-        right_kicking = extract_number(text, r"kicking\s*power[^:]*right[^:]*[:\s]*([\d.]+)")
-    if not right_kicking:
-        right_kicking = extract_number(text, r"right\s*kicking\s*power[:\s]*([\d.]+)")
-    if not right_kicking:
-        match = re.search(r"right.{0,20}?kicking.{0,20}?([\d.]+)", text, re.IGNORECASE | re.DOTALL)
-        if match:
-            right_kicking = float(match.group(1))
-
-    # DEBUG: Log extraction results
-    logger.info(f"[BALLWORK KICKING DEBUG] Left kicking power extracted: {left_kicking}")
-    logger.info(f"[BALLWORK KICKING DEBUG] Right kicking power extracted: {right_kicking}")
-
-    # Speed
-    top_speed = extract_number(text, r"top\s*speed[:\s]*([\d.]+)")
-    sprints = extract_number(text, r"sprints[:\s]*(\d+)")
-
-    # Agility
-    left_turns = extract_number(text, r"left\s*turns[:\s]*(\d+)")
-    back_turns = extract_number(text, r"back\s*turns[:\s]*(\d+)")
-    right_turns = extract_number(text, r"right\s*turns[:\s]*(\d+)")
-    intense_turns = extract_number(text, r"intense\s*turns[:\s]*(\d+)")
-    entry_speed = extract_number(text, r"(?:average\s*)?turn\s*entry\s*speed[:\s]*([\d.]+)")
-    exit_speed = extract_number(text, r"(?:average\s*)?turn\s*exit\s*speed[:\s]*([\d.]+)")
 
-    return {
-        "session": {
-            "session_name": session_name,
-            "date": date_str,
-            "duration_minutes": duration,
-            "training_type": training_type,
-            "intensity": intensity,
-        },
-        "highlights": {
-            "ball_touches": ball_touches,
-            "total_distance_miles": total_distance,
-            "sprint_distance_yards": sprint_distance,
-            "accl_decl": accl_decl,
-            "kicking_power_mph": kicking_power,
-        },
-        "two_footed": {
-            "left_foot_touches": left_touches,
-            "left_foot_touches_percentage": left_touches_pct,
-            "right_foot_touches": right_touches,
-            "right_foot_touches_percentage": right_touches_pct,
-            "left_foot_releases": left_releases,
-            "left_foot_releases_percentage": left_releases_pct,
-            "right_foot_releases": right_releases,
-            "right_foot_releases_percentage": right_releases_pct,
-            "left_foot_kicking_power_mph": left_kicking,
-            "right_foot_kicking_power_mph": right_kicking,
-        },
-        "speed": {"top_speed_mph": top_speed, "sprints": sprints},
-        "agility": {
-            "left_turns": left_turns,
-            "back_turns": back_turns,
-            "right_turns": right_turns,
-            "intense_turns": intense_turns,
-            "average_turn_entry_speed_mph": entry_speed,
-            "average_turn_exit_speed_mph": exit_speed,
-        },
-    }
+async def validate_session_type(client, image_blocks, claimed_type, digest=None):
+    """Validate that uploaded images match the claimed session type.
+
+    Args:
+        client: AsyncAnthropic client instance
+        image_blocks: Image content blocks already built for extraction (reused, not re-encoded)
+        claimed_type: Session type claimed by user ("match", "ball_work", "speed_agility")
+        digest: Optional sample_digest() of the uploads; results are cached under it
 
+    Returns:
+        tuple: (is_valid: bool, detected_type: str, confidence: str)
+    """
+    # More images than any training session allows can only be a match - skip the API call
+    if claimed_type == "match" and len(image_blocks) > max(SESSION_TYPE_LIMITS.values()):
+        logger.info("Validation skipped by heuristic (%s images)", len(image_blocks))
+        return True, "match", "confident"
 
-def extract_speed_agility_data(text):
-    """Extract Speed & Agility session data from OCR text"""
-    text = text.lower()
+    cache_key = (digest, claimed_type)
+    if digest is not None and cache_key in _validation_cache:
+        logger.info("Validation result reused for identical images")
+        return _validation_cache[cache_key]
 
-    # Session info
-    session_name_match = re.search(
-        r"((?:january|february|march|april|may|june|july|august|september|october|november|december)\s+\d{1,2},\s*\d{4}\s+(?:morning|afternoon|evening)[^,]*)",
-        text,
-        re.IGNORECASE,
-    )
-    session_name = session_name_match.group(1).strip() if session_name_match else None
+    logger.info("Validating session type - claimed: %s", claimed_type)
 
-    date_match = re.search(
-        r"((?:january|february|march|april|may|june|july|august|september|october|november|december)\s+\d{1,2},\s*\d{4})",
-        text,
-        re.IGNORECASE,
-    )
-    date_str = None
-    if date_match:
-        try:
-            date_obj = datetime.strptime(date_match.group(1), "%B %d, %Y")
-            date_str = date_obj.strftime("%Y-%m-%d")
-        except ValueError as e:
-            print(f"[WARNING] Date parsing failed for '{date_match.group(1)}': {e}")
-            date_str = None
-
-    duration = extract_number(text, r"(\d+)\s*min")
-    training_type = extract_value(text, r"(technical|physical|tactical)", default="Physical")
-    intensity = extract_value(text, r"(low|moderate|high)", default="Moderate")
-
-    # Highlights
-    total_distance = extract_number(text, r"total\s*distance[:\s]*([\d.]+)")
-    sprint_distance = extract_number(text, r"sprint\s*distance[:\s]*([\d.]+)")
-    accl_decl = extract_number(text, r"accl\s*/\s*decl[:\s]*(\d+)")
-
-    # Speed
-    top_speed = extract_number(text, r"top\s*speed[:\s]*([\d.]+)")
-    sprints = extract_number(text, r"sprints[:\s]*(\d+)")
-
-    # Agility
-    left_turns = extract_number(text, r"left\s*turns[:\s]*(\d+)")
-    back_turns = extract_number(text, r"back\s*turns[:\s]*(\d+)")
-    right_turns = extract_number(text, r"right\s*turns[:\s]*(\d+)")
-    intense_turns = extract_number(text, r"intense\s*turns[:\s]*(\d+)")
-    entry_speed = extract_number(text, r"(?:average\s*)?turn\s*entry\s*speed[:\s]*([\d.]+)")
-    exit_speed = extract_number(text, r"(?:average\s*)?turn\s*exit\s*speed[:\s]*([\d.]+)")
+    # Sample 1-2 images for validation (first and middle if more than 3 images)
+    validation_content = validation_sample(image_blocks)
+    validation_content.append({"type": "text", "text": _VALIDATION_PROMPT})
 
-    return {
-        "session": {
-            "session_name": session_name,
-            "date": date_str,
-            "duration_minutes": duration,
-            "training_type": training_type,
-            "intensity": intensity,
-        },
-        "highlights": {
-            "total_distance_miles": total_distance,
-            "sprint_distance_yards": sprint_distance,
-            "accl_decl": accl_decl,
-        },
-        "speed": {"top_speed_mph": top_speed, "sprints": sprints},
-        "agility": {
-            "left_turns": left_turns,
-            "back_turns": back_turns,
-            "right_turns": right_turns,
-            "intense_turns": intense_turns,
-            "average_turn_entry_speed_mph": entry_speed,
-            "average_turn_exit_speed_mph": exit_speed,
-        },
-    }
+    # Call Claude for validation (use Haiku for speed and cost)
+    try:
+        message = await create_message(
+            client,
+            model="claude-3-haiku-20240307",
+            max_tokens=50,
+            messages=[{"role": "user", "content": validation_content}],
+        )
 
+        response = message.content[0].text.strip()
+        logger.info("Validation response: '%s'", response)
 
-def extract_match_data(text):
-    """Extract Match session data from OCR text"""
-    text_lower = text.lower()
+        # Parse response
+        is_uncertain = response.lower().startswith("uncertain:")
+        detected_type = response.replace("uncertain:", "").strip().lower()
 
-    # Session info
-    session_name_match = re.search(
-        r"((?:january|february|march|april|may|june|july|august|september|october|november|december)\s+\d{1,2},\s*\d{4}\s+(?:morning|afternoon|evening))",
-        text_lower,
-        re.IGNORECASE,
-    )
-    session_name = session_name_match.group(1).strip() if session_name_match else None
+        # Normalize detected type
+        if "match" in detected_type:
+            detected_type = "match"
+        elif "ball work" in detected_type:
+            detected_type = "ball_work"
+        elif "speed" in detected_type and "agility" in detected_type:
+            detected_type = "speed_agility"
 
-    date_match = re.search(
-        r"((?:january|february|march|april|may|june|july|august|september|october|november|december)\s+\d{1,2},\s*\d{4})",
-        text_lower,
-        re.IGNORECASE,
-    )
-    date_str = None
-    if date_match:
-        try:
-            date_obj = datetime.strptime(date_match.group(1), "%B %d, %Y")
-            date_str = date_obj.strftime("%Y-%m-%d")
-        except ValueError as e:
-            print(f"[WARNING] Date parsing failed for '{date_match.group(1)}': {e}")
-            date_str = None
-
-    duration = extract_number(text_lower, r"(\d+)\s*min")
-
-    # Match overview
-    position = extract_value(text_lower, r"([a-z]{1,3})\s+position", default=None)
-    goals = extract_number(text_lower, r"goals\s+(\d+)")
-    assists = extract_number(text_lower, r"assists\s+(\d+)")
-
-    # Team scores - looking for pattern like "cityplay fc 1 : 4 fc westlake"
-    score_match = re.search(r"(\d+)\s*:\s*(\d+)", text_lower)
-    if score_match:
-        athlete_score = int(score_match.group(1))
-        opposing_score = int(score_match.group(2))
-    else:
-        athlete_score = None
-        opposing_score = None
-
-    # Opponent name - text after the score pattern
-    opponent_match = re.search(r"\d+\s*:\s*\d+\s+(.+?)(?:\n|$)", text_lower)
-    opposing_team_name = opponent_match.group(1).strip() if opponent_match else None
-
-    # Skills scores - simpler patterns matching "two-footed 55" format
-    two_footed = extract_number(text_lower, r"two-?footed\s+(\d+)")
-    dribbling = extract_number(text_lower, r"dribbling\s+(\d+)")
-    first_touch = extract_number(text_lower, r"first\s+touch\s+(\d+)")
-    agility_score = extract_number(text_lower, r"agility\s+(\d+)")
-    speed_score = extract_number(text_lower, r"speed\s+(\d+)")
-    power_score = extract_number(text_lower, r"power\s+(\d+)")
-
-    # Highlights - simpler patterns matching actual format
-    work_rate = extract_number(text_lower, r"work\s+rate\s+([\d.]+)")
-    ball_possessions = extract_number(text_lower, r"ball\s+possessions\s+(\d+)")
-    total_distance = extract_number(text_lower, r"total\s+distance\s+([\d.]+)")
-    sprint_distance = extract_number(text_lower, r"sprint\s+distance\s+([\d.]+)")
-    top_speed = extract_number(text_lower, r"top\s+speed\s+([\d.]+)")
-    kicking_power = extract_number(text_lower, r"kicking\s+power\s+([\d.]+)")
-
-    # Two-footed - More flexible patterns (with or without parentheses)
-    left_touches = extract_number(text_lower, r"left\s+foot[^:]*touch[^:]*[:\s]*(\d+)")
-    left_touches_pct = extract_number(
-        text_lower, r"left\s+foot[^:]*touch[^:]*\(?(\d+)%\)?"
-    ) or extract_number(text_lower, r"(\d+)%.*?left.*?touch")
-    right_touches = extract_number(text_lower, r"right\s+foot[^:]*touch[^:]*[:\s]*(\d+)")
-    right_touches_pct = extract_number(
-        text_lower, r"right\s+foot[^:]*touch[^:]*\(?(\d+)%\)?"
-    ) or extract_number(text_lower, r"(\d+)%.*?right.*?touch")
-
-    left_releases = extract_number(text_lower, r"left\s+foot[^:]*release[^:]*[:\s]*(\d+)")
-    left_releases_pct = extract_number(
-        text_lower, r"left\s+foot[^:]*release[^:]*\(?(\d+)%\)?"
-    ) or extract_number(text_lower, r"(\d+)%.*?left.*?release")
-    right_releases = extract_number(text_lower, r"right\s+foot[^:]*release[^:]*[:\s]*(\d+)")
-    right_releases_pct = extract_number(
-        text_lower, r"right\s+foot[^:]*release[^:]*\(?(\d+)%\)?"
-    ) or extract_number(text_lower, r"(\d+)%.*?right.*?release")
-
-    left_receives = extract_number(text_lower, r"left\s+foot[^:]*receive[^:]*[:\s]*(\d+)")
-    left_receives_pct = extract_number(
-        text_lower, r"left\s+foot[^:]*receive[^:]*\(?(\d+)%\)?"
-    ) or extract_number(text_lower, r"(\d+)%.*?left.*?receive")
-    right_receives = extract_number(text_lower, r"right\s+foot[^:]*receive[^:]*[:\s]*(\d+)")
-    right_receives_pct = extract_number(
-        text_lower, r"right\s+foot[^:]*receive[^:]*\(?(\d+)%\)?"
-    ) or extract_number(text_lower, r"(\d+)%.*?right.*?receive")
-
-    # Kicking power - Multiple pattern attempts for robustness
-    # DEBUG: Log kicking power section
-    kicking_section = re.search(
-        r".{0,100}kicking\s*power.{0,200}", text_lower, re.IGNORECASE | re.DOTALL
-    )
-    if kicking_section:
-        logger.info(f"[KICKING DEBUG] OCR text: {kicking_section.group()}")
-
-    # Pattern 1: Standard "left foot kicking power: 23.49 mph"
-    left_kicking = extract_number(text_lower, r"left\s+foot\s*kicking\s*power[:\s]*(\d+\.?\d*)")
-    # Pattern 2: Try with optional "mph" and more flexible spacing
-    if not left_kicking:
-        left_kicking = extract_number(
-            text_lower, r"left\s*foot[^:]*kicking[^:]*power[:\s]*(\d+\.?\d*)"
-        )
-    # Pattern 3: Try reverse order "kicking power left foot"
-    if not left_kicking:
-        left_kicking = extract_number(text_lower, r"kicking\s*power[^:]*left[^:]*[:\s]*(\d+\.?\d*)")
-
-    right_kicking = extract_number(text_lower, r"right\s+foot\s*kicking\s*power[:\s]*(\d+\.?\d*)")
-    if not right_kicking:
-        right_kicking = extract_number(
-            text_lower, r"right\s*foot[^:]*kicking[^:]*power[:\s]*(\d+\.?\d*)"
+        # Compare with claimed type
+        is_valid = detected_type == claimed_type.lower()
+        confidence = "uncertain" if is_uncertain else "confident"
+
+        logger.info(
+            "Validation result - detected: %s, valid: %s, confidence: %s",
+            detected_type,
+            is_valid,
+            confidence,
         )
-    if not right_kicking:
-        right_kicking = extract_number(
-            text_lower, r"kicking\s*power[^:]*right[^:]*[:\s]*(\d+\.?\d*)"
+        if digest is not None:
+            _validation_cache[cache_key] = is_valid, detected_type, confidence
+        return is_valid, detected_type, confidence
+
+    except Exception as e:
+        logger.warning("Validation failed: %s", e)
+        # If validation fails, allow processing to continue (don't block on validation errors)
+        return True, claimed_type, "validation_error"
+
+
+async def extract_session_data(client, content):
+    """Extract session data from all images in a single Claude Vision call.
+
+    Args:
+        client: AsyncAnthropic client instance
+        content: Message content blocks (all images followed by the extraction prompt)
+
+    Returns:
+        str: Raw response text from Claude
+    """
+    logger.info("Calling Claude API with %s images...", len(content) - 1)
+    try:
+        message = await create_message(
+            client,
+            model="claude-3-5-sonnet-20241022",  # Try Sonnet first for better extraction
+            max_tokens=4096,
+            messages=[{"role": "user", "content": content}],
         )
-    # Pattern 4: Try without "foot" - just "right kicking power"
-    if not right_kicking:
-        right_kicking = extract_number(text_lower, r"right\s*kicking\s*power[:\s]*(\d+\.?\d*)")
-    # Pattern 5: Super loose - any decimal number after "right" within 20 chars of "kicking"
-    if not right_kicking:
-        match = re.search(
-            r"right.{0,20}?kicking.{0,20}?(\d+\.\d+)", text_lower, re.IGNORECASE | re.DOTALL
+        logger.info("Using Claude 3.5 Sonnet")
+    except ThrottleTimeout:
+        raise  # Out of budget, so Haiku would be too
+    except Exception as e:
+        # Fallback to Haiku if Sonnet not available
+        logger.info("Sonnet not available (%s), falling back to Haiku", e)
+        message = await create_message(
+            client,
+            model="claude-3-haiku-20240307",
+            max_tokens=4096,
+            messages=[{"role": "user", "content": content}],
         )
-        if match:
-            right_kicking = float(match.group(1))
+        logger.info("Using Claude 3 Haiku")
 
-    # DEBUG: Log extraction results
-    logger.info(f"[KICKING DEBUG] Left kicking power extracted: {left_kicking}")
-    logger.info(f"[KICKING DEBUG] Right kicking power extracted: {right_kicking}")
+    return message.content[0].text
 
-    # Dribbling
-    distance_with_ball = extract_number(text_lower, r"distance\s+with\s+ball[:\s]*(\d+\.?\d*)\s*yd")
-    top_speed_with_ball = extract_number(
-        text_lower, r"top\s+speed\s+with\s+ball[:\s]*(\d+\.?\d*)\s*mph"
-    )
-    intense_turns_with_ball = extract_number(
-        text_lower, r"intense\s+turns\s+with\s+ball[:\s]*(\d+)"
+
+def session_mismatch_error(claimed_type, is_valid, detected_type, confidence):
+    """Error message if validation confidently contradicts the claimed type, else None"""
+    if is_valid:
+        if confidence == "uncertain":
+            logger.warning("Session type detection was uncertain, proceeding with user's selection")
+        return None
+
+    # Allow confusion between session types that share many visual metrics
+    confused_pairs = {
+        frozenset({"match", "ball_work"}),
+        frozenset({"speed_agility", "ball_work"}),
+    }
+    is_known_confusion = frozenset({claimed_type, detected_type}) in confused_pairs
+
+    if confidence == "uncertain" or is_known_confusion:
+        # Allow uncertain matches or known session type overlaps to proceed
+        logger.warning(
+            "Validation uncertain or known overlap - detected: %s, claimed: %s, "
+            "proceeding with user's selection",
+            detected_type,
+            claimed_type,
+        )
+        return None
+
+    # Only block if we're confident and it's a clear mismatch (e.g., Speed & Agility vs Match)
+    display_detected = detected_type.replace("_", " ").title()
+    display_claimed = claimed_type.replace("_", " ").title()
+    return (
+        f"Session type mismatch: Images appear to be '{display_detected}' "
+        f"but you selected '{display_claimed}'. Please verify your selection."
     )
 
-    # First touch - possessions
-    one_touch_poss = extract_number(text_lower, r"one[- ]touch[:\s]*(\d+)")
-    multiple_touch_poss = extract_number(text_lower, r"multiple[- ]touch[:\s]*(\d+)")
-    total_duration_sec = extract_number(text_lower, r"total\s+duration[:\s]*(\d+\.?\d*)\s*s")
 
-    # First touch - ball release footzone
-    laces = extract_number(text_lower, r"laces[:\s]*(\d+)")
-    inside = extract_number(text_lower, r"inside[:\s]*(\d+)")
-    other_footzone = extract_number(text_lower, r"other[:\s]*(\d+)")
+async def _validate_and_extract(client, files, claimed_type, extraction_prompt):
+    """Run session type validation and data extraction concurrently.
 
-    # Agility
-    left_turns = extract_number(
-        text_lower,
-        r"(\d+)[^\d]*\d+[^\d]*\d+[^\d]*left\s+turns?[^\d]*back\s+turns?[^\d]*right\s+turns?",
-    )
-    back_turns = extract_number(
-        text_lower,
-        r"\d+[^\d]*(\d+)[^\d]*\d+[^\d]*left\s+turns?[^\d]*back\s+turns?[^\d]*right\s+turns?",
-    )
-    right_turns = extract_number(
-        text_lower,
-        r"\d+[^\d]*\d+[^\d]*(\d+)[^\d]*left\s+turns?[^\d]*back\s+turns?[^\d]*right\s+turns?",
-    )
-    intense_turns = extract_number(text_lower, r"intense\s+turns?(?!\s+with\s+ball)\s*[:\s#]*(\d+)")
-    entry_speed = extract_number(
-        text_lower, r"(?:average\s*)?(?:turn|tum)\s+entry\s+speed[:\s]*(\d+\.?\d*)"
-    )
-    exit_speed = extract_number(
-        text_lower, r"(?:average\s*)?(?:turn|tum)\s+exit\s+speed[:\s]*(\d+\.?\d*)"
-    )
+    Duplicate uploads are sent only once. In server mode the images are uploaded
+    once through the Files API, referenced by file_id and deleted in the background
+    once the request is done; otherwise they are sent inline as base64. A cached
+    validation result is checked first so a known mismatch is rejected before
+    anything is uploaded; otherwise the extraction call is cancelled as soon as
+    validation rejects the session type.
+
+    Returns:
+        tuple: (mismatch error message or None, extraction response text or None)
+    """
+    files, digests = await dedupe_files(files)
+    digest = sample_digest(digests)
+
+    # A cached rejection needs no upload at all
+    cached = _validation_cache.get((digest, claimed_type))
+    if cached is not None:
+        error_msg = session_mismatch_error(claimed_type, *cached)
+        if error_msg:
+            logger.info("Validation result reused for identical images")
+            return error_msg, None
+
+    file_ids = await upload_images(client, files) if API_KEY_MODE == "server" else []
+    try:
+        if file_ids:
+            image_blocks = [
+                {"type": "image", "source": {"type": "file", "file_id": file_id}}
+                for file_id in file_ids
+            ]
+        else:
+            image_blocks = await build_image_blocks(files)
+        content = image_blocks + [{"type": "text", "text": extraction_prompt}]
 
-    # Speed
-    sprints = extract_number(text_lower, r"sprints?\s*[:\s#]*(\d+)")
+        extraction = asyncio.ensure_future(extract_session_data(client, content))
+        try:
+            if cached is not None:
+                error_msg = None
+            else:
+                validation = await validate_session_type(client, image_blocks, claimed_type, digest)
+                error_msg = session_mismatch_error(claimed_type, *validation)
+        except BaseException:
+            extraction.cancel()
+            raise
+        if error_msg:
+            if not extraction.cancel() and not extraction.cancelled():
+                extraction.exception()  # Already finished; retrieve so a failure isn't unhandled
+            return error_msg, None
+        return None, await extraction
+    finally:
+        if file_ids:
+            # Cleanup needn't hold up the response
+            run_in_background(delete_uploaded_files(client, file_ids))
 
-    # Power
-    first_step_accel = extract_number(text_lower, r"first[- ]step[:\s]*(\d+)")
-    intense_accel = extract_number(text_lower, r"intense\s+(?:accel|acceleration)[:\s]*(\d+)")
 
-    return {
-        "session": {
-            "session_name": session_name,
-            "date": date_str,
-            "duration_minutes": duration,
-            "training_type": "Match",
-        },
-        "overview": {
-            "position": position,
-            "goals": goals,
-            "assists": assists,
-            "athlete_team_score": athlete_score,
-            "opposing_team_score": opposing_score,
-            "opposing_team_name": opposing_team_name,
-        },
-        "skills": {
-            "two_footed_score": two_footed,
-            "dribbling_score": dribbling,
-            "first_touch_score": first_touch,
-            "agility_score": agility_score,
-            "speed_score": speed_score,
-            "power_score": power_score,
-        },
-        "highlights": {
-            "work_rate_yd_per_min": work_rate,
-            "ball_possessions": ball_possessions,
-            "total_distance_mi": total_distance,
-            "sprint_distance_yd": sprint_distance,
-            "top_speed_mph": top_speed,
-            "kicking_power_mph": kicking_power,
-        },
-        "two_footed": {
-            "left_foot_touches": left_touches,
-            "left_foot_touches_pct": left_touches_pct,
-            "right_foot_touches": right_touches,
-            "right_foot_touches_pct": right_touches_pct,
-            "left_foot_releases": left_releases,
-            "left_foot_releases_pct": left_releases_pct,
-            "right_foot_releases": right_releases,
-            "right_foot_releases_pct": right_releases_pct,
-            "left_foot_receives": left_receives,
-            "left_foot_receives_pct": left_receives_pct,
-            "right_foot_receives": right_receives,
-            "right_foot_receives_pct": right_receives_pct,
-            "left_foot_kicking_power_mph": left_kicking,
-            "right_foot_kicking_power_mph": right_kicking,
-        },
-        "dribbling": {
-            "distance_with_ball_yd": distance_with_ball,
-            "top_speed_with_ball_mph": top_speed_with_ball,
-            "intense_turns_with_ball": intense_turns_with_ball,
-        },
-        "first_touch": {
-            "ball_possessions": {
-                "total": ball_possessions,
-                "one_touch": one_touch_poss,
-                "multiple_touch": multiple_touch_poss,
-                "total_duration_sec": total_duration_sec,
-            },
-            "ball_release_footzone": {"laces": laces, "inside": inside, "other": other_footzone},
-        },
-        "agility": {
-            "left_turns": left_turns,
-            "back_turns": back_turns,
-            "right_turns": right_turns,
-            "intense_turns": intense_turns,
-            "avg_turn_entry_speed_mph": entry_speed,
-            "avg_turn_exit_speed_mph": exit_speed,
-        },
-        "speed": {"top_speed_mph": top_speed, "sprints": sprints},
-        "power": {
-            "first_step_accelerations": first_step_accel,
-            "intense_accelerations": intense_accel,
-        },
-    }
+@app.route("/process", methods=["POST"])
+def process_images():
+    """Process uploaded images and extract session data"""
+    try:
+        session_type = request.form.get("session_type")
+        if session_type not in _VALID_SESSIONS:
+            return jsonify({"error": "Invalid session type"}), 400
+
+        files = request.files.getlist("images")
 
+        logger.info(
+            "[%s MODE] Processing request - Session: %s, Files: %s",
+            API_KEY_MODE.upper(),
+            session_type,
+            len(files),
+        )
+
+        if not files:
+            return jsonify({"error": "No images uploaded"}), 400
+
+        # Validate file count
+        if len(files) > MAX_FILES:
+            return jsonify({"error": f"Too many files. Maximum {MAX_FILES} allowed"}), 400
+
+        # Validate session-type-specific image count (signature validation)
+        if session_type in SESSION_TYPE_LIMITS:
+            max_for_type = SESSION_TYPE_LIMITS[session_type]
+            if len(files) > max_for_type:
+                type_display = session_type.replace("_", " ").title()
+                return (
+                    jsonify(
+                        {
+                            "error": f"{type_display} sessions should have at most {max_for_type} images. "
+                            f"You uploaded {len(files)}. Please check your session type selection."
+                        }
+                    ),
+                    400,
+                )
 
-def extract_number(text, pattern):
-    """Extract a number from text using regex pattern"""
-    match = re.search(pattern, text, re.IGNORECASE)
-    if match:
+        # Get API key based on mode
+        if API_KEY_MODE == "server":
+            api_key = SERVER_API_KEY
+            if not api_key:
+                logger.error("Server mode but no API key configured")
+                return jsonify({"error": "Server configuration error"}), 500
+        else:
+            # User mode - get from request
+            api_key = request.form.get("api_key")
+            if not api_key:
+                return jsonify({"error": "API key is required"}), 400
+
+        extraction_prompt = _PROMPTS[session_type]
+
+        # Validate session type (Haiku) and extract data (Sonnet) concurrently
+        client = get_client(api_key)
+        error_msg, response_text = run_async(
+            _validate_and_extract(client, files, session_type, extraction_prompt)
+        )
+        if error_msg:
+            logger.error(error_msg)
+            return jsonify({"error": error_msg}), 400
+
+        logger.info("Received response: %s characters", len(response_text))
+
+        # Parse JSON response directly
         try:
-            return float(match.group(1)) if "." in match.group(1) else int(match.group(1))
-        except ValueError:
-            return None
-    return None
+            # Extract JSON from response (handle if Claude adds any wrapper text)
+            json_start = response_text.find("{")
+            json_end = response_text.rfind("}") + 1
+            if json_start >= 0 and json_end > json_start:
+                # app.json parses with orjson when it's installed
+                extracted_json = app.json.loads(response_text[json_start:json_end])
+                logger.info("[SUCCESS] Extracted %s fields from JSON", len(extracted_json))
 
+                # DEBUG: Log kicking power fields from Claude's response
+                logger.debug(
+                    "[CLAUDE JSON] left_kicking_power: %s", extracted_json.get("left_kicking_power")
+                )
+                logger.debug(
+                    "[CLAUDE JSON] right_kicking_power: %s",
+                    extracted_json.get("right_kicking_power"),
+                )
+                logger.debug(
+                    "[CLAUDE JSON] kicking_power (max): %s", extracted_json.get("kicking_power")
+                )
+            else:
+                logger.error("No JSON found in response")
+                return jsonify({"error": "Failed to extract JSON from response"}), 500
+        except json.JSONDecodeError as e:
+            logger.error("JSON parsing failed: %s", e)
+            logger.error("Response text: %s", response_text[:500])
+            return jsonify({"error": f"Invalid JSON response: {str(e)}"}), 500
 
-def extract_value(text, pattern, default=None):
-    """Extract a text value from text using regex pattern"""
-    match = re.search(pattern, text, re.IGNORECASE)
-    if match:
-        return match.group(1).capitalize()
-    return default
+        # Format result based on session type (convert flat JSON to nested structure)
+        logger.info("Formatting result for %s...", session_type)
+        result = _FORMATTERS[session_type](extracted_json)
+
+        logger.info("[SUCCESS] Extraction complete!")
+        payload = {"success": True, "data": result}
+        if request.args.get("debug") == "1":
+            payload["ocr_text"] = response_text  # Raw Claude output, only when debugging
+        return jsonify(payload)
+
+    except RequestEntityTooLarge as e:
+        logger.error("Upload too large: %s", e.description)
+        return jsonify({"error": e.description}), 413
+    except anthropic.AuthenticationError as e:
+        logger.error("Authentication error: %s", e)
+        error_msg = "Invalid API key" if API_KEY_MODE == "user" else "Server API key invalid"
+        return jsonify({"error": error_msg}), 401
+    except anthropic.RateLimitError as e:
+        logger.error("Rate limit: %s", e)
+        return jsonify({"error": "Rate limit exceeded. Try again later."}), 429
+    except ThrottleTimeout as e:
+        logger.warning("Throttled: %s", e)
+        response = jsonify({"error": "Server is busy. Try again in a minute."})
+        response.headers["Retry-After"] = str(math.ceil(e.retry_after))
+        return response, 503
+    except Exception as e:
+        logger.error("Unexpected: %s: %s", type(e).__name__, e)
+        if FLASK_ENV == "development":
+            import traceback
 
+            traceback.print_exc()
+            return jsonify({"error": f"{type(e).__name__}: {str(e)}"}), 500
+        else:
+            return jsonify({"error": "Processing error occurred"}), 500
 
-def format_match_result(data):
-    """Format flat JSON into nested Match structure"""
+
+# Nested output layouts: (output key, flat JSON key) pairs, or (section, nested layout)
+_MATCH_LAYOUT = (
+    (
+        "session",
+        (
+            ("session_name", "session_name"),
+            ("date", "date"),
+            ("duration_minutes", "duration_minutes"),
+        ),
+    ),
+    (
+        "overview",
+        (
+            ("position", "position"),
+            ("goals", "goals"),
+            ("assists", "assists"),
+            ("team_left", "team_left"),
+            ("team_right", "team_right"),
+            ("score_left", "score_left"),
+            ("score_right", "score_right"),
+        ),
+    ),
+    (
+        "skills",
+        (
+            ("two_footed_score", "two_footed_score"),
+            ("dribbling_score", "dribbling_score"),
+            ("first_touch_score", "first_touch_score"),
+            ("agility_score", "agility_score"),
+            ("speed_score", "speed_score"),
+            ("power_score", "power_score"),
+        ),
+    ),
+    (
+        "highlights",
+        (
+            ("work_rate_yd_per_min", "work_rate"),
+            ("ball_possessions", "ball_possessions"),
+            ("total_distance_mi", "total_distance"),
+            ("sprint_distance_yd", "sprint_distance"),
+            ("top_speed_mph", "top_speed"),
+            ("kicking_power_mph", "kicking_power"),
+        ),
+    ),
+    (
+        "two_footed",
+        (
+            ("left_foot_touches", "left_touches"),
+            ("left_foot_touches_pct", "left_touches_pct"),
+            ("right_foot_touches", "right_touches"),
+            ("right_foot_touches_pct", "right_touches_pct"),
+            ("left_foot_releases", "left_releases"),
+            ("left_foot_releases_pct", "left_releases_pct"),
+            ("right_foot_releases", "right_releases"),
+            ("right_foot_releases_pct", "right_releases_pct"),
+            ("left_foot_receives", "left_receives"),
+            ("left_foot_receives_pct", "left_receives_pct"),
+            ("right_foot_receives", "right_receives"),
+            ("right_foot_receives_pct", "right_receives_pct"),
+            ("left_foot_kicking_power_mph", "left_kicking_power"),
+            ("right_foot_kicking_power_mph", "right_kicking_power"),
+        ),
+    ),
+    (
+        "dribbling",
+        (
+            ("distance_with_ball_yd", "distance_with_ball"),
+            ("top_speed_with_ball_mph", "top_speed_with_ball"),
+            ("intense_turns_with_ball", "intense_turns_with_ball"),
+        ),
+    ),
+    (
+        "first_touch",
+        (
+            (
+                "ball_possessions",
+                (
+                    ("total", "ball_possessions"),
+                    ("one_touch", "one_touch_poss"),
+                    ("multiple_touch", "multiple_touch_poss"),
+                    ("total_duration_sec", "total_duration_sec"),
+                ),
+            ),
+            (
+                "ball_release_footzone",
+                (
+                    ("laces", "laces"),
+                    ("inside", "inside"),
+                    ("other", "other_footzone"),
+                ),
+            ),
+        ),
+    ),
+    (
+        "agility",
+        (
+            ("left_turns", "left_turns"),
+            ("back_turns", "back_turns"),
+            ("right_turns", "right_turns"),
+            ("intense_turns", "intense_turns"),
+            ("avg_turn_entry_speed_mph", "avg_turn_entry"),
+            ("avg_turn_exit_speed_mph", "avg_turn_exit"),
+        ),
+    ),
+    (
+        "speed",
+        (
+            ("top_speed_mph", "top_speed"),
+            ("sprints", "num_sprints"),
+        ),
+    ),
+    (
+        "power",
+        (
+            ("first_step_accelerations", "first_step_accel"),
+            ("intense_accelerations", "intense_accel"),
+        ),
+    ),
+)
+
+_BALL_WORK_LAYOUT = (
+    (
+        "session",
+        (
+            ("session_name", "session_name"),
+            ("date", "date"),
+            ("duration_minutes", "duration_minutes"),
+            ("training_type", "training_type"),
+            ("intensity", "intensity"),
+        ),
+    ),
+    (
+        "highlights",
+        (
+            ("ball_touches", "ball_touches"),
+            ("total_distance_miles", "total_distance"),
+            ("sprint_distance_yards", "sprint_distance"),
+            ("accl_decl", "accelerations"),
+            ("kicking_power_mph", "kicking_power"),
+        ),
+    ),
+    (
+        "two_footed",
+        (
+            ("left_foot_touches", "left_touches"),
+            ("left_foot_touches_percentage", "left_pct"),
+            ("right_foot_touches", "right_touches"),
+            ("right_foot_touches_percentage", "right_pct"),
+            ("left_foot_releases", "left_releases"),
+            ("left_foot_releases_percentage", "left_release_pct"),
+            ("right_foot_releases", "right_releases"),
+            ("right_foot_releases_percentage", "right_release_pct"),
+            ("left_foot_kicking_power_mph", "left_kicking_power"),
+            ("right_foot_kicking_power_mph", "right_kicking_power"),
+        ),
+    ),
+    (
+        "speed",
+        (
+            ("top_speed_mph", "top_speed"),
+            ("sprints", "num_sprints"),
+        ),
+    ),
+    (
+        "agility",
+        (
+            ("left_turns", "left_turns"),
+            ("back_turns", "back_turns"),
+            ("right_turns", "right_turns"),
+            ("intense_turns", "intense_turns"),
+            ("average_turn_entry_speed_mph", "avg_turn_entry"),
+            ("average_turn_exit_speed_mph", "avg_turn_exit"),
+        ),
+    ),
+)
+
+_SPEED_AGILITY_LAYOUT = (
+    (
+        "session",
+        (
+            ("session_name", "session_name"),
+            ("date", "date"),
+            ("duration_minutes", "duration_minutes"),
+            ("training_type", "training_type"),
+            ("intensity", "intensity"),
+        ),
+    ),
+    (
+        "highlights",
+        (
+            ("total_distance_miles", "total_distance"),
+            ("sprint_distance_yards", "sprint_distance"),
+            ("accl_decl", "accelerations"),
+        ),
+    ),
+    (
+        "speed",
+        (
+            ("top_speed_mph", "top_speed"),
+            ("sprints", "num_sprints"),
+        ),
+    ),
+    (
+        "agility",
+        (
+            ("left_turns", "left_turns"),
+            ("back_turns", "back_turns"),
+            ("right_turns", "right_turns"),
+            ("intense_turns", "intense_turns"),
+            ("average_turn_entry_speed_mph", "avg_turn_entry"),
+            ("average_turn_exit_speed_mph", "avg_turn_exit"),
+        ),
+    ),
+)
+
+
+def _apply_layout(layout, get):
+    """Build a nested result by looking every flat JSON key in `layout` up with `get`
+    (the flat dict's bound .get, looked up once per result rather than once per key)"""
     return {
-        "session": {
-            "session_name": data.get("session_name"),
-            "date": data.get("date"),
-            "duration_minutes": data.get("duration_minutes"),
-            "training_type": "Match",
-        },
-        "overview": {
-            "position": data.get("position"),
-            "goals": data.get("goals"),
-            "assists": data.get("assists"),
-            "team_left": data.get("team_left"),
-            "team_right": data.get("team_right"),
-            "score_left": data.get("score_left"),
-            "score_right": data.get("score_right"),
-        },
-        "skills": {
-            "two_footed_score": data.get("two_footed_score"),
-            "dribbling_score": data.get("dribbling_score"),
-            "first_touch_score": data.get("first_touch_score"),
-            "agility_score": data.get("agility_score"),
-            "speed_score": data.get("speed_score"),
-            "power_score": data.get("power_score"),
-        },
-        "highlights": {
-            "work_rate_yd_per_min": data.get("work_rate"),
-            "ball_possessions": data.get("ball_possessions"),
-            "total_distance_mi": data.get("total_distance"),
-            "sprint_distance_yd": data.get("sprint_distance"),
-            "top_speed_mph": data.get("top_speed"),
-            "kicking_power_mph": data.get("kicking_power"),
-        },
-        "two_footed": {
-            "left_foot_touches": data.get("left_touches"),
-            "left_foot_touches_pct": data.get("left_touches_pct"),
-            "right_foot_touches": data.get("right_touches"),
-            "right_foot_touches_pct": data.get("right_touches_pct"),
-            "left_foot_releases": data.get("left_releases"),
-            "left_foot_releases_pct": data.get("left_releases_pct"),
-            "right_foot_releases": data.get("right_releases"),
-            "right_foot_releases_pct": data.get("right_releases_pct"),
-            "left_foot_receives": data.get("left_receives"),
-            "left_foot_receives_pct": data.get("left_receives_pct"),
-            "right_foot_receives": data.get("right_receives"),
-            "right_foot_receives_pct": data.get("right_receives_pct"),
-            "left_foot_kicking_power_mph": data.get("left_kicking_power"),
-            "right_foot_kicking_power_mph": data.get("right_kicking_power"),
-        },
-        "dribbling": {
-            "distance_with_ball_yd": data.get("distance_with_ball"),
-            "top_speed_with_ball_mph": data.get("top_speed_with_ball"),
-            "intense_turns_with_ball": data.get("intense_turns_with_ball"),
-        },
-        "first_touch": {
-            "ball_possessions": {
-                "total": data.get("ball_possessions"),
-                "one_touch": data.get("one_touch_poss"),
-                "multiple_touch": data.get("multiple_touch_poss"),
-                "total_duration_sec": data.get("total_duration_sec"),
-            },
-            "ball_release_footzone": {
-                "laces": data.get("laces"),
-                "inside": data.get("inside"),
-                "other": data.get("other_footzone"),
-            },
-        },
-        "agility": {
-            "left_turns": data.get("left_turns"),
-            "back_turns": data.get("back_turns"),
-            "right_turns": data.get("right_turns"),
-            "intense_turns": data.get("intense_turns"),
-            "avg_turn_entry_speed_mph": data.get("avg_turn_entry"),
-            "avg_turn_exit_speed_mph": data.get("avg_turn_exit"),
-        },
-        "speed": {"top_speed_mph": data.get("top_speed"), "sprints": data.get("num_sprints")},
-        "power": {
-            "first_step_accelerations": data.get("first_step_accel"),
-            "intense_accelerations": data.get("intense_accel"),
-        },
+        key: get(source) if isinstance(source, str) else _apply_layout(source, get)
+        for key, source in layout
     }
 
 
+def format_match_result(data):
+    """Format flat JSON into nested Match structure"""
+    result = _apply_layout(_MATCH_LAYOUT, data.get)
+    result["session"]["training_type"] = "Match"
+    return result
+
+
 def format_ball_work_result(data):
     """Format flat JSON into nested Ball Work structure"""
-    return {
-        "session": {
-            "session_name": data.get("session_name"),
-            "date": data.get("date"),
-            "duration_minutes": data.get("duration_minutes"),
-            "training_type": data.get("training_type"),
-            "intensity": data.get("intensity"),
-        },
-        "highlights": {
-            "ball_touches": data.get("ball_touches"),
-            "total_distance_miles": data.get("total_distance"),
-            "sprint_distance_yards": data.get("sprint_distance"),
-            "accl_decl": data.get("accelerations"),
-            "kicking_power_mph": data.get("kicking_power"),
-        },
-        "two_footed": {
-            "left_foot_touches": data.get("left_touches"),
-            "left_foot_touches_percentage": data.get("left_pct"),
-            "right_foot_touches": data.get("right_touches"),
-            "right_foot_touches_percentage": data.get("right_pct"),
-            "left_foot_releases": data.get("left_releases"),
-            "left_foot_releases_percentage": data.get("left_release_pct"),
-            "right_foot_releases": data.get("right_releases"),
-            "right_foot_releases_percentage": data.get("right_release_pct"),
-            "left_foot_kicking_power_mph": data.get("left_kicking_power"),
-            "right_foot_kicking_power_mph": data.get("right_kicking_power"),
-        },
-        "speed": {"top_speed_mph": data.get("top_speed"), "sprints": data.get("num_sprints")},
-        "agility": {
-            "left_turns": data.get("left_turns"),
-            "back_turns": data.get("back_turns"),
-            "right_turns": data.get("right_turns"),
-            "intense_turns": data.get("intense_turns"),
-            "average_turn_entry_speed_mph": data.get("avg_turn_entry"),
-            "average_turn_exit_speed_mph": data.get("avg_turn_exit"),
-        },
-    }
+    return _apply_layout(_BALL_WORK_LAYOUT, data.get)
 
 
 def format_speed_agility_result(data):
     """Format flat JSON into nested Speed & Agility structure"""
-    return {
-        "session": {
-            "session_name": data.get("session_name"),
-            "date": data.get("date"),
-            "duration_minutes": data.get("duration_minutes"),
-            "training_type": data.get("training_type"),
-            "intensity": data.get("intensity"),
-        },
-        "highlights": {
-            "total_distance_miles": data.get("total_distance"),
-            "sprint_distance_yards": data.get("sprint_distance"),
-            "accl_decl": data.get("accelerations"),
-        },
-        "speed": {"top_speed_mph": data.get("top_speed"), "sprints": data.get("num_sprints")},
-        "agility": {
-            "left_turns": data.get("left_turns"),
-            "back_turns": data.get("back_turns"),
-            "right_turns": data.get("right_turns"),
-            "intense_turns": data.get("intense_turns"),
-            "average_turn_entry_speed_mph": data.get("avg_turn_entry"),
-            "average_turn_exit_speed_mph": data.get("avg_turn_exit"),
-        },
-    }
+    return _apply_layout(_SPEED_AGILITY_LAYOUT, data.get)
+
 
+# Session type -> formatter for Claude's flat JSON (keys match _PROMPTS)
+_FORMATTERS = {
+    "match": format_match_result,
+    "ball_work": format_ball_work_result,
+    "speed_agility": format_speed_agility_result,
+}
 
 if __name__ == "__main__":
-    print("Starting Soccer OCR Server...")
-    print(f"Mode: {API_KEY_MODE.upper()}")
-    print(f"Environment: {FLASK_ENV}")
+    logger.info("Starting Soccer OCR Server...")
+    logger.info("Mode: %s", API_KEY_MODE.upper())
+    logger.info("Environment: %s", FLASK_ENV)
     if FLASK_ENV == "production":
-        print("WARNING: Use gunicorn for production!")
+        logger.error("The Flask dev server is for development only.")
+        logger.error("Run production with: gunicorn -c gunicorn_conf.py server:app")
+        sys.exit(1)
 
     port = int(os.environ.get("PORT", 5000))
     debug = FLASK_ENV == "development"
-    print(f"Open http://localhost:{port} in your browser")
+    logger.info("Open http://localhost:%s in your browser", port)
     app.run(host="0.0.0.0", port=port, debug=debug)
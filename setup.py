@@ -0,0 +1,15 @@
+"""
+Optional mypyc build of the OCR extractors
+Usage: pip install mypy && python setup.py build_ext --inplace
+
+The compiled extension sits next to extractors.py and is imported in its
+place; delete the built .so to go back to the pure-Python module.
+"""
+
+from setuptools import setup
+from mypyc.build import mypycify
+
+setup(
+    name="soccertrainerocr-extractors",
+    ext_modules=mypycify(["extractors.py"]),
+)
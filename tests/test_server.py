@@ -0,0 +1,294 @@
+"""
+Rate limiting and request handling in server.py
+"""
+
+import asyncio
+import collections
+import io
+import time
+import types
+
+import anthropic
+import httpx
+import pytest
+from cachetools import TTLCache
+
+import server
+
+
+def _call_tokens(images, max_tokens, prompt):
+    content = [{"type": "image"} for _ in range(images)] + [{"type": "text", "text": prompt}]
+    return server.estimate_tokens([{"role": "user", "content": content}], max_tokens)
+
+
+@pytest.mark.parametrize("session_type,images", [("ball_work", 1), ("speed_agility", 2)])
+def test_default_budget_admits_back_to_back_requests(session_type, images):
+    limiter = server.RateLimiter(server.CLAUDE_RPM, server.CLAUDE_TPM)
+    validation = _call_tokens(images, 50, server._VALIDATION_PROMPT)
+    extraction = _call_tokens(images, 4096, server._PROMPTS[session_type])
+
+    async def request():
+        await limiter.acquire(validation, max_wait=0)
+        await limiter.acquire(extraction, max_wait=0)
+
+    # Two full requests within a minute go through without waiting (or a ThrottleTimeout)
+    asyncio.run(request())
+    asyncio.run(request())
+
+
+def test_call_over_whole_budget_is_admitted_then_blocks_the_next():
+    limiter = server.RateLimiter(40, 1000)
+    asyncio.run(limiter.acquire(5000, max_wait=0))
+    with pytest.raises(server.ThrottleTimeout):
+        asyncio.run(limiter.acquire(10, max_wait=0))
+
+
+def test_reconcile_frees_overestimated_budget():
+    limiter = server.RateLimiter(40, 1000)
+    entry = asyncio.run(limiter.acquire(900, max_wait=0))
+    limiter.reconcile(entry, 100)
+    asyncio.run(limiter.acquire(800, max_wait=0))
+
+
+def test_rate_limits_are_per_api_key():
+    spent = server.rate_limiter_for("spent-key")
+    asyncio.run(spent.acquire(server.CLAUDE_TPM, max_wait=0))
+    with pytest.raises(server.ThrottleTimeout):
+        asyncio.run(spent.acquire(10, max_wait=0))
+
+    # Another user's key has its own quota, so it isn't held up by the spent one
+    asyncio.run(server.rate_limiter_for("other-key").acquire(10, max_wait=0))
+    assert server.rate_limiter_for("spent-key") is spent
+
+
+def _status_error(status, **headers):
+    request = httpx.Request("POST", "https://api.anthropic.com/v1/messages")
+    response = httpx.Response(status, headers=headers, request=request)
+    return anthropic.APIStatusError(f"HTTP {status}", response=response, body=None)
+
+
+def _message():
+    return types.SimpleNamespace(usage=types.SimpleNamespace(input_tokens=10, output_tokens=10))
+
+
+def _create_failing_with(errors):
+    """A throttled create that raises `errors` in turn, then succeeds; returns (create, calls)"""
+    calls = []
+
+    @server.throttled
+    async def create(client, **kwargs):
+        calls.append(kwargs)
+        if len(calls) <= len(errors):
+            raise errors[len(calls) - 1]
+        return _message()
+
+    return create, calls
+
+
+_KWARGS = {
+    "max_tokens": 10,
+    "messages": [{"role": "user", "content": [{"type": "text", "text": "x"}]}],
+}
+
+
+@pytest.mark.parametrize("status", [408, 409, 429, 500, 529])
+def test_retryable_statuses_are_retried_after_retry_after(status):
+    create, calls = _create_failing_with([_status_error(status, **{"retry-after-ms": "10"})])
+    client = types.SimpleNamespace(api_key=f"retry-{status}")
+    assert asyncio.run(create(client, **_KWARGS)) is not None
+    assert len(calls) == 2
+
+
+@pytest.mark.parametrize(
+    "error",
+    [_status_error(400), _status_error(529, **{"x-should-retry": "false"})],
+    ids=["bad_request", "should_retry_false"],
+)
+def test_other_errors_are_not_retried(error):
+    create, calls = _create_failing_with([error])
+    with pytest.raises(anthropic.APIStatusError):
+        asyncio.run(create(types.SimpleNamespace(api_key="no-retry"), **_KWARGS))
+    assert len(calls) == 1
+
+
+def test_retry_delay_prefers_retry_after_header():
+    assert server._retry_delay(_status_error(429, **{"retry-after": "3"}), 0) == 3
+    assert server._retry_delay(_status_error(429, **{"retry-after-ms": "250"}), 0) == 0.25
+    assert server._retry_delay(_status_error(429, **{"retry-after": "3600"}), 2) == 4
+
+
+# /process against a fake AsyncAnthropic
+
+
+def _reply(text):
+    return types.SimpleNamespace(
+        content=[types.SimpleNamespace(text=text)],
+        usage=types.SimpleNamespace(input_tokens=100, output_tokens=50),
+    )
+
+
+@pytest.fixture
+def claude(monkeypatch):
+    """Replace AsyncAnthropic with a fake; the returned namespace configures and records it.
+
+    detect: the validation reply; extraction_delay: seconds the extraction call takes;
+    upload_error: raised by Files API uploads after the first one
+    """
+    state = types.SimpleNamespace(
+        detect="Match",
+        extraction_delay=0,
+        upload_error=None,
+        calls=[],
+        uploads=[],
+        deletes=[],
+        extraction_cancelled=False,
+        clients=[],
+    )
+
+    async def create(**kwargs):
+        state.calls.append(kwargs)
+        if kwargs["max_tokens"] == 50:  # Session type validation
+            await asyncio.sleep(0.01)  # A round trip, so the concurrent extraction gets going
+            return _reply(state.detect)
+        try:
+            await asyncio.sleep(state.extraction_delay)
+        except asyncio.CancelledError:
+            state.extraction_cancelled = True
+            raise
+        return _reply('{"date": "2026-02-04", "session_name": "Evening"}')
+
+    async def beta_create(betas, **kwargs):
+        return await create(**kwargs)
+
+    async def upload(file):
+        if state.uploads and state.upload_error is not None:
+            raise state.upload_error
+        state.uploads.append(file[0])
+        return types.SimpleNamespace(id=f"file_{file[0]}")
+
+    async def delete(file_id):
+        state.deletes.append(file_id)
+
+    class FakeAsyncAnthropic:
+        def __init__(self, api_key=None, max_retries=None):
+            self.api_key = api_key
+            self.closed = False
+            self.messages = types.SimpleNamespace(create=create)
+            self.beta = types.SimpleNamespace(
+                messages=types.SimpleNamespace(create=beta_create),
+                files=types.SimpleNamespace(upload=upload, delete=delete),
+            )
+            state.clients.append(self)
+
+        async def close(self):
+            self.closed = True
+
+    monkeypatch.setattr(server, "AsyncAnthropic", FakeAsyncAnthropic)
+    monkeypatch.setattr(server, "API_KEY_MODE", "user")
+    monkeypatch.setattr(server, "SERVER_API_KEY", "server-key")
+    monkeypatch.setattr(server, "_clients", collections.OrderedDict())
+    monkeypatch.setattr(server, "_rate_limiters", collections.OrderedDict())
+    monkeypatch.setattr(server, "_validation_cache", TTLCache(maxsize=16, ttl=60))
+    return state
+
+
+def _post(session_type="match", images=(b"a", b"b"), query=""):
+    data = {
+        "session_type": session_type,
+        "api_key": "user-key",
+        "images": [(io.BytesIO(image), f"img{i}.png") for i, image in enumerate(images)],
+    }
+    return server.app.test_client().post(
+        f"/process{query}", data=data, content_type="multipart/form-data"
+    )
+
+
+def _image_sources(call):
+    return [
+        block["source"]["type"] for block in call["messages"][0]["content"] if "source" in block
+    ]
+
+
+def _extraction_calls(claude):
+    return [call for call in claude.calls if call["max_tokens"] != 50]
+
+
+def _wait_for(condition, timeout=2.0):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline, "timed out"
+        time.sleep(0.01)
+
+
+def test_process_returns_extracted_data(claude):
+    response = _post()
+    assert response.status_code == 200
+    assert response.get_json()["data"]["session"]["session_name"] == "Evening"
+
+
+def test_ocr_text_only_with_debug_flag(claude):
+    assert "ocr_text" not in _post().get_json()
+    assert "Evening" in _post(query="?debug=1").get_json()["ocr_text"]
+
+
+def test_extraction_is_cancelled_when_validation_rejects(claude):
+    claude.detect = "Speed and Agility"
+    claude.extraction_delay = 30
+    started = time.monotonic()
+    response = _post()
+    assert response.status_code == 400
+    assert "mismatch" in response.get_json()["error"]
+    assert time.monotonic() - started < 5
+    _wait_for(lambda: claude.extraction_cancelled)
+
+
+def test_duplicate_uploads_are_sent_once(claude):
+    assert _post(images=(b"same", b"other", b"same")).status_code == 200
+    assert [len(_image_sources(call)) for call in _extraction_calls(claude)] == [2]
+
+
+def test_server_mode_uploads_through_files_api_and_deletes_afterwards(claude, monkeypatch):
+    monkeypatch.setattr(server, "API_KEY_MODE", "server")
+    assert _post().status_code == 200
+    assert claude.uploads == ["img0.png", "img1.png"]
+    assert _image_sources(_extraction_calls(claude)[0]) == ["file", "file"]
+    _wait_for(lambda: sorted(claude.deletes) == ["file_img0.png", "file_img1.png"])
+
+
+def test_files_api_failure_falls_back_to_base64(claude, monkeypatch):
+    monkeypatch.setattr(server, "API_KEY_MODE", "server")
+    claude.upload_error = RuntimeError("upload failed")
+    assert _post().status_code == 200
+    assert _image_sources(_extraction_calls(claude)[0]) == ["base64", "base64"]
+    # The upload that did succeed is cleaned up
+    assert claude.deletes == ["file_img0.png"]
+
+
+def test_cached_rejection_skips_upload(claude, monkeypatch):
+    monkeypatch.setattr(server, "API_KEY_MODE", "server")
+    claude.detect = "Speed and Agility"
+    assert _post().status_code == 400
+    assert claude.uploads
+
+    claude.uploads.clear()
+    claude.calls.clear()
+    assert _post().status_code == 400
+    assert claude.uploads == []
+    assert claude.calls == []
+
+
+def test_oversized_file_is_rejected_with_413(claude, monkeypatch):
+    monkeypatch.setattr(server, "MAX_FILE_SIZE", 1024)
+    response = _post(images=(b"x" * 1025,))
+    assert response.status_code == 413
+    assert claude.calls == []
+
+
+def test_client_evicted_from_cache_is_closed(claude, monkeypatch):
+    monkeypatch.setattr(server, "CLIENT_CACHE_SIZE", 1)
+    monkeypatch.setattr(server, "CLIENT_CLOSE_DELAY", 0)
+    first = server.get_client("first-key")
+    assert server.get_client("first-key") is first
+    server.get_client("second-key")
+    _wait_for(lambda: first.closed)
+    assert not server.get_client("second-key").closed